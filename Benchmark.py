@@ -0,0 +1,273 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+import GameIntervalCreation
+import makeCombinedDataset
+import FeatureStore
+import Profiler
+
+#the stats GameIntervalCreation reads for both teams, and their average per team per game
+rawStats = {'Score': 2.8, 'Score5v5': 2.0, 'ScoreClose5v5': 1.0, 'Shots': 30, 'Shot_Attempts': 55, 'Shot_Attempts5v5': 45,
+            'Shot_AttemptsClose5v5': 20, 'FO': 30, 'Hits': 22, 'PIM': 8, 'Blocks': 14, 'Give': 9, 'Take': 7, 'PPO': 3,
+            'PPG': 0.6, 'xG': 2.6, 'xG5v5': 1.9, 'xGClose5v5': 0.9}
+
+#the largest league and history the generator creates
+maxTeams = 40
+maxSeasons = 40
+
+#the game windows and cross modes that make up the combined frame
+windows = [5,10,20,40,82]
+crosses = [False,True]
+
+#how each cost is expected to grow with the number of games, larger exponents are flagged
+expectedGrowth = {'collectDataForTeam': 0, 'createFrame': 1, 'makeCombinedDataset': 1, 'chooseModel': 1}
+
+def syntheticData(teams=32,seasons=10,games=82,seed=0):
+    """Create seeded game data with the columns of NHLData.csv that GameIntervalCreation reads.
+
+    Each matchday every team plays once, with one team resting when there is an odd number of teams.
+    Teams get a hidden strength every season that raises their stats and their chance of winning,
+    so models trained on the data have something to find.
+
+    Parameters:
+        teams(Int) - the number of teams, at most maxTeams.
+        seasons(Int) - the number of seasons, starting in 2010, at most maxSeasons.
+        games(Int) - the number of matchdays in each season.
+        seed(Int) - the random seed.
+
+    Returns:
+        data(DataFrame) - one row per game.
+    """
+    if not 2 <= teams <= maxTeams:
+        raise ValueError("teams must be between 2 and " + str(maxTeams))
+    if not 1 <= seasons <= maxSeasons:
+        raise ValueError("seasons must be between 1 and " + str(maxSeasons))
+
+    rng = np.random.default_rng(seed)
+    names = np.array(['T' + str(t).zfill(2) for t in range(teams)])
+    frames = []
+
+    for s in range(seasons):
+        season = 2010 + s
+        strength = rng.normal(0,0.25,teams)
+
+        #pair the teams at random on every matchday
+        days = np.repeat(np.arange(games),teams // 2)
+        pairs = np.concatenate([rng.permutation(teams)[:teams // 2 * 2].reshape(-1,2) for _ in range(games)])
+        away, home = pairs[:,0], pairs[:,1]
+
+        frame = pd.DataFrame({'Game_Id': season * 1000000 + 20000 + np.arange(1,len(pairs) + 1),
+                              'season': season,
+                              'Date': (pd.Timestamp(season,10,5) + pd.to_timedelta(days * 2,unit='D')).strftime('%Y-%m-%d'),
+                              'isPlayoffs': 0,
+                              'Away_Team': names[away],
+                              'Home_Team': names[home]})
+
+        #the stronger team gets more of everything
+        edge = np.exp((strength[home] - strength[away]) / 2)
+        for stat, mean in rawStats.items():
+            frame['Away_' + stat] = rng.poisson(mean / edge).astype(float)
+            frame['Home_' + stat] = rng.poisson(mean * edge).astype(float)
+
+        #ties are settled in overtime, with an extra goal for the winner
+        tied = (frame['Home_Score'] == frame['Away_Score']).to_numpy()
+        homeWinsOT = rng.random(len(frame)) < edge**2 / (1 + edge**2)
+        frame.loc[tied & homeWinsOT,'Home_Score'] += 1
+        frame.loc[tied & ~homeWinsOT,'Away_Score'] += 1
+        frame['RegOrOT'] = np.where(tied,'OT','REG')
+        frame['Winner'] = np.where(frame['Home_Score'] > frame['Away_Score'],frame['Home_Team'],frame['Away_Team'])
+
+        frames.append(frame)
+
+    return pd.concat(frames,ignore_index=True)
+
+def windowFrames(data,seed=0):
+    """Create frames shaped like the output of createFrame for every game window and cross mode.
+
+    The features are random with a little signal, which is enough to time combining and training
+    without building every window for real.
+
+    Parameters:
+        data(DataFrame) - the cleaned game data.
+        seed(Int) - the random seed.
+
+    Returns:
+        frames(Dict) - the frames keyed by (game window, cross), as returned by GameIntervalCreation.runParallel.
+    """
+    rng = np.random.default_rng(seed)
+    stats = GameIntervalCreation.baseCols[6:-1]
+    outcome = (data['Winner'] == data['Home_Team']).astype(int).to_numpy()
+
+    base = pd.DataFrame({'Game_Id': data['Game_Id'].to_numpy(),
+                         'RegOrOT': data['RegOrOT'].to_numpy(),
+                         'Away_Team': data['Away_Team'].to_numpy(),
+                         'Home_Team': data['Home_Team'].to_numpy(),
+                         'season': data['season'].to_numpy(),
+                         'isPlayoff': data['isPlayoffs'].to_numpy()})
+
+    frames = {}
+    for cross in crosses:
+        for i in windows:
+            values = rng.normal(size=(len(data),len(stats))) + 0.2 * outcome[:,None]
+            features = pd.DataFrame(values,columns=stats)
+            frames[(i,cross)] = pd.concat([base,features,pd.DataFrame({'Outcome': outcome})],axis=1)
+
+    return frames
+
+def benchmarkScale(teams,seasons,games,seed=0,sample=20):
+    """Time each step of the pipeline for one size of league, using a temporary cache.
+
+    createFrame is timed on the last games of the data, where every earlier game is available, and
+    the time per game is multiplied out to every game and every window frame. collectDataForTeam
+    is timed the same way.
+
+    Parameters:
+        teams(Int) - the number of teams.
+        seasons(Int) - the number of seasons.
+        games(Int) - the number of matchdays in each season.
+        seed(Int) - the random seed.
+        sample(Int) - the number of games createFrame is timed on.
+
+    Returns:
+        result(Dict) - the size of the data, the seconds taken by each step and the peak memory after each step.
+    """
+    folder = tempfile.mkdtemp(prefix='nhlbench')
+    FeatureStore.cacheDir = os.path.join(folder,'Cache')
+    seconds = {}
+    memory = {}
+
+    try:
+        path = os.path.join(folder,'NHLData.csv')
+        syntheticData(teams,seasons,games,seed).to_csv(path,index=False)
+        data = GameIntervalCreation.loadData(path)
+        gameIds = data['Game_Id'].unique()
+        last = data.iloc[-1]
+
+        #one team's features with the whole history before the last game available
+        history = data[data['Date'] < last['Date']]
+        start = time.perf_counter()
+        for _ in range(sample):
+            GameIntervalCreation.collectDataForTeam(last['Home_Team'],history,10)
+        seconds['collectDataForTeam'] = (time.perf_counter() - start) / sample
+        memory['collectDataForTeam'] = Profiler.maxRSS()
+
+        #the last games of the data, scaled up to every game of every window frame
+        start = time.perf_counter()
+        GameIntervalCreation.createFrame(data,pd.DataFrame(columns=GameIntervalCreation.baseCols),10,True,gameIds[-sample:])
+        perGame = (time.perf_counter() - start) / min(sample,len(gameIds))
+        seconds['createFrame'] = perGame * len(gameIds) * len(windows) * len(crosses)
+        memory['createFrame'] = Profiler.maxRSS()
+
+        #join the window frames and write the feature store
+        frames = windowFrames(data,seed)
+        store = os.path.join(folder,'CombinedFrame.parquet')
+        start = time.perf_counter()
+        FeatureStore.writeStore(makeCombinedDataset.combineFrames(frames),store)
+        seconds['makeCombinedDataset'] = time.perf_counter() - start
+        memory['makeCombinedDataset'] = Profiler.maxRSS()
+        del frames
+
+        #train and test every phase with enough games to predict the last season
+        import ModelCreation
+        start = time.perf_counter()
+        dataset = FeatureStore.GameDataset(path=store)
+        season = int(dataset.season.max())
+        for phase in dataset.phases:
+            if dataset.split(season,phase,'train')[1].shape[0] >= 50 and dataset.split(season,phase,'test')[1].shape[0] > 0:
+                ModelCreation.chooseModel(season,phase,dataset)
+        seconds['chooseModel'] = time.perf_counter() - start
+        memory['chooseModel'] = Profiler.maxRSS()
+    finally:
+        shutil.rmtree(folder,ignore_errors=True)
+
+    return {'teams': teams, 'seasons': seasons, 'games': len(gameIds), 'seconds': seconds, 'memoryMB': memory}
+
+def growthExponent(sizes,values):
+    """Fit how a cost grows with the number of games, 1 is linear and 2 is quadratic.
+
+    Parameters:
+        sizes(List) - the number of games at each scale.
+        values(List) - the cost at each scale.
+
+    Returns:
+        exponent(Float) - the slope of the cost against the number of games on a log-log scale.
+    """
+    return float(np.polyfit(np.log(sizes),np.log(values),1)[0])
+
+def report(results,tolerance=0.5):
+    """Describe the cost of every step at every scale and flag steps that grow too quickly.
+
+    Parameters:
+        results(List) - the result of benchmarkScale for each scale, smallest first.
+        tolerance(Float) - how far an exponent can exceed its expected growth before it is flagged.
+
+    Returns:
+        lines(List) - the lines of the report.
+        flagged(List) - the steps that grew faster than expected.
+    """
+    steps = list(expectedGrowth)
+    lines = ["Teams  Seasons  Games   " + "".join(s.ljust(22) for s in steps) + "Peak MB"]
+    for r in results:
+        lines.append(str(r['teams']).ljust(7) + str(r['seasons']).ljust(9) + str(r['games']).ljust(8) +
+                     "".join((str(round(r['seconds'][s],4)) + "s").ljust(22) for s in steps) +
+                     str(round(max(r['memoryMB'].values()),1)))
+
+    lines.append("")
+    flagged = []
+    if len(set(r['games'] for r in results)) < 2:
+        lines.append("At least two sizes are needed to fit scaling curves")
+        return lines, flagged
+
+    sizes = [r['games'] for r in results]
+    lines.append("Growth with the number of games (time ~ games^k)")
+    for s in steps:
+        exponent = growthExponent(sizes,[r['seconds'][s] for r in results])
+        line = s.ljust(22) + "time k=" + str(round(exponent,2)) + " (expected " + str(expectedGrowth[s]) + ")"
+        if exponent > expectedGrowth[s] + tolerance:
+            flagged.append(s)
+            line += "  <-- grows faster than expected"
+            if expectedGrowth[s] == 1 and exponent > 1.5:
+                line += ", likely quadratic"
+        lines.append(line)
+
+    memory = growthExponent(sizes,[max(r['memoryMB'].values()) for r in results])
+    lines.append("peak memory".ljust(22) + "k=" + str(round(memory,2)))
+
+    return lines, flagged
+
+def main(argv=None):
+    """Run the scaling benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Time the feature build, combination and model training on synthetic leagues of growing size.")
+    parser.add_argument("--scales",nargs='+',default=['8,2,82','8,4,82','8,8,82'],help="teams,seasons,games for each run, smallest first")
+    parser.add_argument("--seed",type=int,default=0,help="the random seed of the synthetic data")
+    parser.add_argument("--sample",type=int,default=20,help="the number of games createFrame and collectDataForTeam are timed on")
+    parser.add_argument("--tolerance",type=float,default=0.5,help="how far a growth exponent can exceed its expected value")
+    parser.add_argument("--output",default="bench_output.txt",help="where the report is written")
+    parser.add_argument("--data",help="write synthetic NHLData to this csv using the first scale and stop")
+    args = parser.parse_args(argv)
+
+    scales = [tuple(int(n) for n in scale.split(',')) for scale in args.scales]
+
+    if args.data:
+        syntheticData(*scales[0],seed=args.seed).to_csv(args.data,index=False)
+        return 0
+
+    #every scale runs in a fresh process so its peak memory is its own
+    with Pool(1,maxtasksperchild=1) as pool:
+        results = pool.starmap(benchmarkScale,[scale + (args.seed,args.sample) for scale in scales],chunksize=1)
+
+    lines, flagged = report(results,args.tolerance)
+    with open(args.output,'w') as f:
+        f.write("\n".join(lines) + "\n")
+    print("\n".join(lines))
+
+    return 1 if flagged else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -708,6 +708,5 @@ def main():
     #output the data to a csv
     finalDF.to_csv("Database/NHLData.csv",index=False)
 
-main()
-
-
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,593 @@
+import hashlib
+import json
+import copy
+import os
+import pandas as pd
+import numpy as np
+
+#the columns that describe a game rather than a feature
+keep_same = ['Game_Id','RegOrOT','season','Away_Team','Home_Team','Outcome','isPlayoff']
+
+#the columns derived when the store is written
+labelColumns = ['Phase']
+
+#the number of games in the early and middle stage of a team's season
+phaseGames = {'Early': 20, 'Mid': 42}
+
+#where the combined frame and its metadata are stored
+storePath = "DataFrames/CombinedFrame.parquet"
+csvPath = "DataFrames/CombinedFrame.csv"
+
+#where derived results such as feature decisions are cached
+cacheDir = "Cache"
+
+#the number of GameDataset matrices kept in the cache, the least recently used are deleted
+sharedMatrices = 4
+
+#the most bins HistGradientBoostingClassifier gives values that are not missing, see its max_bins
+maxBins = 255
+
+def metadataPath(path=storePath):
+    """Get the location of the metadata sidecar for a store.
+
+    Parameters:
+        path(String) - the location of the store.
+
+    Returns:
+        sidecar(String) - the location of the metadata.
+    """
+    return os.path.splitext(path)[0] + ".json"
+
+def parseFeature(name):
+    """Split a combined feature name into its stat, game window and cross mode.
+
+    Parameters:
+        name(String) - a feature name such as 'Goals 20' or 'Goals 20.1'.
+
+    Returns:
+        stat(String) - the name of the stat.
+        window(Int) - the number of games used.
+        cross(Bool) - whether games from previous seasons were used.
+    """
+    stat, end = name.rsplit(' ',1)
+    cross = end.endswith('.1')
+    window = int(end[:-2]) if cross else int(end)
+
+    return stat, window, cross
+
+def phaseLabels(df,early=phaseGames['Early'],mid=phaseGames['Mid']):
+    """Label each game as Early, Mid or Late in the season.
+
+    A game is early if it is one of the first games of the season for either team. Once early games
+    are removed, a game is mid if it is one of the next games for either team, every other game is late.
+
+    Parameters:
+        df(DataFrame) - the games, with Game_Id, season, Away_Team and Home_Team columns.
+        early(Int) - the number of early games for each team.
+        mid(Int) - the number of middle games for each team.
+
+    Returns:
+        phase(Series) - the phase of each game, aligned with the dataframe.
+    """
+    #one row per team per game in the order games were played
+    games = df[['Game_Id','season']]
+    teamGames = pd.concat([games.assign(Team=df['Away_Team'].values),games.assign(Team=df['Home_Team'].values)])
+    teamGames = teamGames.sort_values('Game_Id',kind='stable')
+
+    #a game is early if it is among the first games for either team
+    number = teamGames.groupby(['season','Team']).cumcount()
+    earlyGames = teamGames['Game_Id'][number.values < early].unique()
+    isEarly = df['Game_Id'].isin(earlyGames).values
+
+    #count the remaining games again to find the middle games
+    remaining = teamGames[~teamGames['Game_Id'].isin(earlyGames)]
+    number = remaining.groupby(['season','Team']).cumcount()
+    midGames = remaining['Game_Id'][number.values < mid].unique()
+    isMid = df['Game_Id'].isin(midGames).values
+
+    phase = np.where(isEarly,'Early',np.where(isMid,'Mid','Late'))
+
+    return pd.Series(phase,index=df.index,name='Phase')
+
+def teamGameIndex(gameIds,seasons,away,home):
+    """Order every team's games of each season once, so phases can be labelled for any boundaries.
+
+    Parameters:
+        gameIds(Array) - the id of each game.
+        seasons(Array) - the season of each game.
+        away(Array) - the away team of each game.
+        home(Array) - the home team of each game.
+
+    Returns:
+        rows(Array) - the game of each team game, grouped by season and team in the order games were played.
+        number(Array) - how many games the team had played before each team game that season.
+    """
+    teams = pd.factorize(np.concatenate([away,home]))[0]
+    rows = np.tile(np.arange(len(gameIds)),2)
+    order = np.lexsort((np.tile(gameIds,2),teams,np.tile(seasons,2)))
+    rows, teams, seasons = rows[order], teams[order], np.tile(seasons,2)[order]
+
+    #team games are numbered from the start of each season and team group
+    first = np.r_[True,(teams[1:] != teams[:-1]) | (seasons[1:] != seasons[:-1])]
+    starts = np.flatnonzero(first)
+    number = np.arange(len(rows)) - np.repeat(starts,np.diff(np.r_[starts,len(rows)]))
+
+    return rows, number
+
+def phaseCodes(index,games,early=phaseGames['Early'],mid=phaseGames['Mid']):
+    """Label each game as Early (0), Mid (1) or Late (2) the same way as phaseLabels, using a team game index.
+
+    Parameters:
+        index(Tuple) - the rows and numbers returned by teamGameIndex.
+        games(Int) - the number of games.
+        early(Int) - the number of early games for each team.
+        mid(Int) - the number of middle games for each team.
+
+    Returns:
+        codes(Array) - the phase of each game as an index into GameDataset.phases.
+    """
+    rows, number = index
+
+    #a game is early if it is among the first games for either team
+    isEarly = np.zeros(games,dtype=bool)
+    isEarly[rows[number < early]] = True
+
+    #number the remaining games of each team by subtracting the early games played before them
+    remaining = ~isEarly[rows]
+    earlyBefore = np.cumsum(~remaining) - (~remaining)
+    earlyBefore = earlyBefore - np.repeat(earlyBefore[number == 0],np.diff(np.r_[np.flatnonzero(number == 0),len(rows)]))
+    isMid = np.zeros(games,dtype=bool)
+    isMid[rows[remaining & (number - earlyBefore < mid)]] = True
+
+    return np.where(isEarly,0,np.where(isMid,1,2)).astype(np.int64)
+
+def writeStore(combined,path=storePath):
+    """Write the combined frame to a parquet store with float32 features and a metadata sidecar.
+
+    Each season is written as its own row group so readers can skip seasons they do not need.
+
+    Parameters:
+        combined(DataFrame) - the combined frame.
+        path(String) - where the store is written.
+
+    Returns:
+        metadata(Dict) - the metadata written alongside the store.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    #keep the game columns and store every feature as float32
+    features = [c for c in combined.columns if c not in keep_same + labelColumns]
+    frame = combined[keep_same].copy()
+
+    #label the season phase of every game once
+    frame['Phase'] = phaseLabels(frame)
+
+    frame = pd.concat([frame,combined[features].astype('float32')],axis=1)
+    frame = frame.sort_values('season',kind='stable').reset_index(drop=True)
+
+    #write one row group per season
+    schema = pa.Schema.from_pandas(frame,preserve_index=False)
+    with pq.ParquetWriter(path,schema) as writer:
+        for season, rows in frame.groupby('season',sort=True):
+            writer.write_table(pa.Table.from_pandas(rows,schema=schema,preserve_index=False))
+
+    #describe every feature so readers can choose columns without opening the store
+    parsed = [parseFeature(c) for c in features]
+    metadata = {
+        'features': features,
+        'order': sorted(features),
+        'stats': sorted(set(p[0] for p in parsed)),
+        'windows': sorted(set(p[1] for p in parsed)),
+        'columns': {c: {'stat': p[0], 'window': p[1], 'cross': p[2]} for c, p in zip(features,parsed)},
+        'seasons': sorted(int(s) for s in frame['season'].unique()),
+        'phases': phaseGames,
+        'rows': int(frame.shape[0])
+    }
+
+    with open(metadataPath(path),'w') as f:
+        json.dump(metadata,f,indent=1)
+
+    return metadata
+
+def convertCSV(source=csvPath,path=storePath):
+    """Convert the combined csv into a store.
+
+    Parameters:
+        source(String) - the location of the combined csv.
+        path(String) - where the store is written.
+
+    Returns:
+        metadata(Dict) - the metadata written alongside the store.
+    """
+    return writeStore(pd.read_csv(source),path)
+
+def readMetadata(path=storePath):
+    """Read the metadata sidecar of a store, creating the store from the combined csv if needed.
+
+    Parameters:
+        path(String) - the location of the store.
+
+    Returns:
+        metadata(Dict) - the feature names, stats, windows and seasons in the store.
+    """
+    if not os.path.exists(path):
+        convertCSV(path=path)
+
+    with open(metadataPath(path)) as f:
+        return json.load(f)
+
+def matchSeasons(seasons,available):
+    """Find the stored seasons that match a season filter.
+
+    Parameters:
+        seasons(List or Tuple) - a list of seasons, or an (operator, season) pair such as ('<=', 2021), None matches every season.
+        available(List) - the seasons in the store.
+
+    Returns:
+        matched(List) - the matching seasons in ascending order.
+    """
+    if seasons is None:
+        return sorted(available)
+
+    if not isinstance(seasons,tuple):
+        return sorted(s for s in available if s in seasons)
+
+    op, value = seasons
+    tests = {'<': lambda s: s < value, '<=': lambda s: s <= value, '>': lambda s: s > value,
+             '>=': lambda s: s >= value, '==': lambda s: s == value, '=': lambda s: s == value,
+             '!=': lambda s: s != value, 'in': lambda s: s in value, 'not in': lambda s: s not in value}
+
+    return sorted(s for s in available if tests[op](s))
+
+def readStore(columns=None,seasons=None,path=storePath):
+    """Read games from the store, loading only the requested features and seasons.
+
+    Parameters:
+        columns(List) - the features to load, None loads every feature.
+        seasons(List or Tuple) - a list of seasons, or an (operator, season) pair such as ('<=', 2021), None loads every season.
+        path(String) - the location of the store.
+
+    Returns:
+        df(DataFrame) - the game columns and phase labels followed by the requested features.
+    """
+    if not os.path.exists(path):
+        convertCSV(path=path)
+
+    if columns is not None:
+        columns = keep_same + labelColumns + [c for c in columns if c not in keep_same + labelColumns]
+
+    #row groups outside the requested seasons are skipped
+    if seasons is None:
+        filters = None
+    elif isinstance(seasons,tuple):
+        filters = [('season',seasons[0],seasons[1])]
+    else:
+        filters = [('season','in',list(seasons))]
+
+    return pd.read_parquet(path,columns=columns,filters=filters)
+
+def fingerprint(*parts):
+    """Create a content hash of arrays, dataframes and plain values.
+
+    Parameters:
+        parts - the arrays, dataframes, series or json-serializable values to hash.
+
+    Returns:
+        key(String) - the hex digest of the parts.
+    """
+    h = hashlib.blake2b(digest_size=16)
+
+    for part in parts:
+        if isinstance(part,pd.DataFrame):
+            h.update(json.dumps([str(c) for c in part.columns]).encode())
+            part = part.to_numpy()
+        elif isinstance(part,pd.Series):
+            part = part.to_numpy()
+
+        if isinstance(part,np.ndarray):
+            h.update((str(part.dtype) + str(part.shape)).encode())
+            h.update(np.ascontiguousarray(part).data)
+        else:
+            h.update(json.dumps(part,sort_keys=True,default=str).encode())
+
+    return h.hexdigest()
+
+def cacheFile(kind,key,ext='.json'):
+    """Get the location of a cached result, creating its directory if needed.
+
+    Parameters:
+        kind(String) - the type of result being cached.
+        key(String) - the fingerprint of the result's inputs.
+        ext(String) - the file extension.
+
+    Returns:
+        path(String) - the location of the cached result.
+    """
+    folder = os.path.join(cacheDir,kind)
+    os.makedirs(folder,exist_ok=True)
+
+    return os.path.join(folder,key + ext)
+
+def readJSON(path):
+    """Read a cached json file.
+
+    Parameters:
+        path(String) - the location of the file.
+
+    Returns:
+        value - the contents of the file, or None if it is missing or could not be read.
+    """
+    if not os.path.exists(path):
+        return None
+
+    #a file that cannot be decoded is treated as missing and written again
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError,json.JSONDecodeError):
+        return None
+
+def writeJSON(path,value,indent=None):
+    """Write a cached json file so readers never see a partly written file.
+
+    Parameters:
+        path(String) - the location of the file.
+        value - the contents to write.
+        indent(Int) - the indent of the json, None for a single line.
+    """
+    #write to a temporary file first, then move it into place in one step
+    temporary = path + '.' + str(os.getpid())
+    with open(temporary,'w') as f:
+        json.dump(value,f,indent=indent)
+    os.replace(temporary,path)
+
+def evictMatrices(keep=sharedMatrices):
+    """Delete all but the most recently used feature matrices cached by GameDataset.
+
+    Processes that still have an evicted matrix mapped keep reading it, the file is only removed
+    from the folder.
+
+    Parameters:
+        keep(Int) - the number of matrices to keep.
+    """
+    folder = os.path.join(cacheDir,'shared')
+    if not os.path.isdir(folder):
+        return
+
+    matrices = [os.path.join(folder,name) for name in os.listdir(folder) if name.endswith('.npy')]
+    matrices.sort(key=os.path.getmtime,reverse=True)
+    for path in matrices[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def binEdges(X,bins=maxBins):
+    """Find quantile bin edges for every feature, so features can be binned once and reused.
+
+    Parameters:
+        X(Array) - the features to bin.
+        bins(Int) - the number of bins, at most maxBins so every code gets its own bin in the estimator.
+
+    Returns:
+        edges(Array) - the bins-1 inner edges of each feature, one row per feature.
+    """
+    quantiles = np.linspace(0,1,bins + 1)[1:-1]
+
+    return np.ascontiguousarray(np.quantile(X,quantiles,axis=0).T.astype(np.float32))
+
+def applyBins(X,edges):
+    """Replace every feature with the code of the bin it falls in.
+
+    Parameters:
+        X(Array) - the features, one column per row of edges.
+        edges(Array) - the edges created by binEdges.
+
+    Returns:
+        codes(Array) - the uint8 bin codes.
+    """
+    assert edges.shape[1] < maxBins, "at most " + str(maxBins) + " bins are supported, got " + str(edges.shape[1] + 1)
+
+    codes = np.empty(X.shape,dtype=np.uint8)
+    for j in range(X.shape[1]):
+        codes[:,j] = np.searchsorted(edges[j],X[:,j],side='right')
+
+    return codes
+
+class GameDataset:
+    """The combined frame loaded, cleaned and partitioned by phase once.
+
+    Rows are ordered by phase, then regulation games before OT games, then season, keeping the
+    original order otherwise. The training games for any season and phase are therefore a single
+    slice of the feature matrix and are handed out as views rather than copies.
+
+    The features are written straight from the store into one contiguous float32 matrix in the final
+    row order, a season at a time, using the column order stored in the sidecar. NaNs and infs are
+    replaced within each season's block, so loading needs the matrix plus one season of games. The
+    matrix is memory-mapped read-only from the cache, so every worker process reads the same pages
+    instead of holding its own copy, and later loads of an unchanged store skip straight to mapping
+    the cached matrix. Only the most recently used matrices are kept, see evictMatrices.
+
+    Every team's games are indexed once when loading, so withPhases can label the games for other
+    phase boundaries without reading the store again.
+
+    Parameters:
+        seasons(List or Tuple) - the seasons to load, see readStore.
+        path(String) - the location of the store.
+        shared(Bool) - should the features be memory-mapped?
+    """
+
+    phases = ['Early','Mid','Late']
+
+    def __init__(self,seasons=None,path=storePath,shared=True):
+        metadata = readMetadata(path)
+        wanted = matchSeasons(seasons,metadata['seasons'])
+
+        #features are kept in sorted order, as columns.difference used to give, older stores do not record it
+        self.features = metadata.get('order') or sorted(metadata['features'])
+
+        #only the game columns are read as a frame, they decide the order of the rows
+        games = readStore(columns=[],seasons=wanted,path=path)
+
+        #order the rows so every training split is contiguous
+        phase = games['Phase'].map({p: i for i, p in enumerate(self.phases)}).to_numpy()
+        isOT = (games['RegOrOT'] == 'OT').to_numpy()
+        order = np.lexsort((games['season'].to_numpy(),isOT,phase))
+
+        self.y = games['Outcome'].to_numpy(dtype='int32')[order]
+        self.season = games['season'].to_numpy()[order]
+        self.phase = phase[order]
+        self.isOT = isOT[order]
+        self.gameIds = games['Game_Id'].to_numpy()[order]
+        self.teamGames = teamGameIndex(self.gameIds,self.season,games['Away_Team'].to_numpy()[order],
+                                       games['Home_Team'].to_numpy()[order])
+        self.boundaries = tuple(metadata.get('phases',phaseGames)[p] for p in ['Early','Mid'])
+        self.ordered = True
+
+        #where each stored game ends up in the matrix
+        destination = np.empty(len(order),dtype=np.int64)
+        destination[order] = np.arange(len(order))
+
+        if not shared:
+            self.X = np.empty((len(order),len(self.features)),dtype=np.float32)
+            self._fill(self.X,path,wanted,destination)
+            return
+
+        #the matrix is cached by the store file and the seasons loaded
+        stats = [os.stat(p) for p in [path,metadataPath(path)]]
+        key = fingerprint([[st.st_size,st.st_mtime_ns] for st in stats],wanted,self.features)
+        matrix = cacheFile('shared',key,'.npy')
+        if not os.path.exists(matrix):
+            temporary = matrix + '.' + str(os.getpid())
+            X = np.lib.format.open_memmap(temporary,mode='w+',dtype=np.float32,shape=(len(order),len(self.features)))
+            self._fill(X,path,wanted,destination)
+            X.flush()
+            del X
+            os.replace(temporary,matrix)
+        else:
+            #mark the matrix as recently used
+            os.utime(matrix)
+        evictMatrices()
+
+        self.X = np.load(matrix,mmap_mode='r')
+
+    def _fill(self,X,path,wanted,destination):
+        """Write the features of the wanted seasons into the matrix, one row group at a time.
+
+        Parameters:
+            X(Array) - the matrix to fill, one row per game in the final order.
+            path(String) - the location of the store.
+            wanted(List) - the seasons being loaded.
+            destination(Array) - the row of the matrix for each stored game of the wanted seasons.
+        """
+        import pyarrow.parquet as pq
+
+        store = pq.ParquetFile(path)
+        start = 0
+
+        #every row group holds a single season, in ascending order
+        for group in range(store.num_row_groups):
+            season = store.read_row_group(group,columns=['season']).column(0)[0].as_py()
+            if season not in wanted:
+                continue
+
+            table = store.read_row_group(group,columns=self.features)
+            block = np.empty((table.num_rows,len(self.features)),dtype=np.float32)
+            for j, name in enumerate(self.features):
+                block[:,j] = table.column(name).to_numpy()
+            del table
+
+            #replace NaNs/Inf in place before placing the block
+            np.nan_to_num(block,copy=False,nan=0,posinf=0,neginf=0)
+            X[destination[start:start + block.shape[0]]] = block
+            start += block.shape[0]
+
+    def withPhases(self,early,mid):
+        """Get a copy of the dataset with games labelled by other phase boundaries.
+
+        The copy shares the feature matrix, only the phase of each game is labelled again from the
+        team game index. Its rows are no longer ordered by phase, so splits are gathered rather
+        than sliced.
+
+        Parameters:
+            early(Int) - the number of early games for each team.
+            mid(Int) - the number of middle games for each team.
+
+        Returns:
+            dataset(GameDataset) - the relabelled dataset.
+        """
+        if (early,mid) == self.boundaries:
+            return self
+
+        dataset = copy.copy(self)
+        dataset.phase = phaseCodes(self.teamGames,len(self.y),early,mid)
+        dataset.boundaries = (early,mid)
+        dataset.ordered = False
+
+        return dataset
+
+    def _block(self,phase,isOT):
+        """Get the bounds of the rows for a phase with or without OT games.
+
+        Parameters:
+            phase(String) - the phase (Early, Mid, Late).
+            isOT(Bool) - whether the OT games are wanted.
+
+        Returns:
+            start(Int) - the first row of the block.
+            end(Int) - one past the last row of the block.
+        """
+        key = self.phases.index(phase) * 2 + int(isOT)
+        codes = self.phase * 2 + self.isOT
+        return int(np.searchsorted(codes,key,'left')), int(np.searchsorted(codes,key,'right'))
+
+    def _seasonRows(self,season,phase,isOT,before=False):
+        """Get the rows of a phase block for a season, or for every season before it.
+
+        Parameters:
+            season(Int) - the season.
+            phase(String) - the phase (Early, Mid, Late).
+            isOT(Bool) - whether the OT games are wanted.
+            before(Bool) - should every earlier season be returned instead?
+
+        Returns:
+            rows(Slice or Array) - the rows in the block, an array of rows when the dataset was relabelled.
+        """
+        if not self.ordered:
+            inSeason = self.season < season if before else self.season == season
+            return np.flatnonzero((self.phase == self.phases.index(phase)) & (self.isOT == isOT) & inSeason)
+
+        start, end = self._block(phase,isOT)
+        seasons = self.season[start:end]
+        first = start if before else start + int(np.searchsorted(seasons,season,'left'))
+        last = start + int(np.searchsorted(seasons,season,'left' if before else 'right'))
+        return slice(first,last)
+
+    def split(self,season,phase,part='train'):
+        """Get the features and outcomes for a season and phase.
+
+        Training games are every regulation game from earlier seasons and are returned as views.
+        Testing games are every game in the season, OT games are appended to the regulation
+        games so a copy is only made when the season has OT games in the phase.
+
+        Parameters:
+            season(Int) - the season being predicted.
+            phase(String) - the phase (Early, Mid, Late).
+            part(String) - either 'train' or 'test'.
+
+        Returns:
+            X(Array) - the features.
+            y(Array) - the outcomes.
+        """
+        if part == 'train':
+            rows = self._seasonRows(season,phase,False,before=True)
+            return self.X[rows], self.y[rows]
+
+        regulation = self._seasonRows(season,phase,False)
+        overtime = self._seasonRows(season,phase,True)
+        if self.y[overtime].shape[0] == 0:
+            return self.X[regulation], self.y[regulation]
+
+        return (np.concatenate([self.X[regulation],self.X[overtime]]),
+                np.concatenate([self.y[regulation],self.y[overtime]]))
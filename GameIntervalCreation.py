@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 def getIndividualStat(statName,team,df,avg=False):
     """Calculate the summed total of a given stat for a given team.
@@ -98,132 +99,79 @@ def calculateCORSI(shotAttemptsFor,shotAttemptsAgainst,average=False):
         case True:
             #account for divided by zero errors
             return (shotAttemptsAgainst + shotAttemptsFor) and (shotAttemptsFor/(shotAttemptsAgainst + shotAttemptsFor)) or 0
-            
-def collectDataForTeam(team,df,gameWindow):
+
+def percentage(part,whole):
+    """Calculate a share, such as a faceoff or shooting percentage.
+
+    Parameters:
+        part(Float) - the amount for the team, such as goals.
+        whole(Float) - the total it is a share of, such as shots.
+
+    Returns:
+        percentage(Float) - the share, 0 when the total is 0.
+    """
+    #account for divided by zero errors
+    return whole and (part/whole) or 0
+
+def savePercentage(goalsAgainst,shotsAgainst):
+    """Calculate the share of shots against that were saved.
+
+    Parameters:
+        goalsAgainst(Float) - the goals against the team.
+        shotsAgainst(Float) - the shots against the team.
+
+    Returns:
+        percentage(Float) - the save percentage, 0 when there were no shots.
+    """
+    return shotsAgainst and (1 - (goalsAgainst/shotsAgainst)) or 0
+
+def collectDataForTeam(team,df,gameWindow,stats=None):
     """Collect all the stats for a certain team before a game.
     
     Parameters:
         team(String) - the abbrieviation of the desired team.
         df(DataFrame) - the available game data.
         gameWindow(Int) - the number of recent games to use.
+        stats(List) - the features to collect, in the order wanted, defaults to every feature in featureNames.
     
     Returns:
         totals(List) - a list with all the statistics to be added to the main dataframe.
     """
     #only select required games
     df = df[(df["Away_Team"] == team) | (df["Home_Team"] == team)].tail(gameWindow)
-    
-    #list where the items to be placed in a row are stored
-    totals = []
-
-    #collect stats
-    goals = getIndividualStat("Score",team,df)
-    goalsAvg = getIndividualStat("Score",team,df,True)
-    goals5v5 = getIndividualStat("Score5v5",team,df)
-    goals5v5Avg = getIndividualStat("Score5v5",team,df,True)
-    goalsClose5v5 = getIndividualStat("ScoreClose5v5",team,df)
-    goalsClose5v5Avg = getIndividualStat("ScoreClose5v5",team,df,True)
-    shots = getIndividualStat("Shots",team,df)
-    shotsAvg = getIndividualStat("Shots",team,df,True)
-    shotAttempts = getIndividualStat("Shot_Attempts",team,df)
-    shotAttempts5v5 = getIndividualStat("Shot_Attempts5v5",team,df)
-    shotAttemptsClose5v5 = getIndividualStat("Shot_AttemptsClose5v5",team,df)
-    faceOffs = getIndividualStat("FO",team,df)
-    hits = getIndividualStat("Hits",team,df)
-    hitsAvg = getIndividualStat("Hits",team,df,True)
-    pims = getIndividualStat("PIM",team,df)
-    pimsAvg = getIndividualStat("PIM",team,df,True)
-    blocks = getIndividualStat("Blocks",team,df)
-    blocksAvg = getIndividualStat("Blocks",team,df,True)
-    giveAways = getIndividualStat("Give",team,df)
-    giveAwaysAvg = getIndividualStat("Give",team,df,True)
-    takeAways = getIndividualStat("Take",team,df)
-    takeAwaysAvg = getIndividualStat("Take",team,df,True)
-    PPO = getIndividualStat("PPO",team,df)
-    PPG = getIndividualStat("PPG",team,df)
-
-    #get XG
-    xg = getIndividualStat("xG",team,df)
-    xgAvg = getIndividualStat("xG",team,df,True)
-    xg5v5 = getIndividualStat("xG5v5",team,df)
-    xg5v5Avg = getIndividualStat("xG5v5",team,df,True)
-    xg5v5Close = getIndividualStat("xGClose5v5",team,df)
-    xg5v5CloseAvg = getIndividualStat("xGClose5v5",team,df,True)
-
-    #get wins and loses
-    winsLoses = getWinsLoses(team,df)
-
-    #calculate shooting percentage
-    shootRate = shots[0] and (goals[0]/shots[0]) or 0
-    
-    #calculate save percentage
-    saveRate = shots[1] and (1 - (goals[1]/shots[1])) or 0
-
-    #calculate shooting percentage
-    shootPer = (shots[0]+goals[0]) and (goals[0]/(shots[0]+goals[0])) or 0
-    
-    #calculate save percentage
-    savePer = (shots[1]+goals[1]) and (1 - (goals[1]/(shots[1]+goals[1]))) or 0
-
-    #PowerPlay Percentage
-    PPPer = PPO[0] and (PPG[0]/PPO[0]) or 0
 
-    #PenaltyKill Percentage
-    PKPer = PPO[1] and (PPG[1]/PPO[1]) or 0
+    #each stat is only summed or averaged once, and only if a requested feature uses it
+    collected = {}
+    def total(statName,avg=False):
+        if (statName,avg) not in collected:
+            if statName == 'Winner':
+                collected[(statName,avg)] = getWinsLoses(team,df)
+            else:
+                collected[(statName,avg)] = getIndividualStat(statName,team,df,avg)
+        return collected[(statName,avg)]
 
-    #calculate the PDO
-    PDOPer = shootPer + savePer
-    
-    #calculate CORSI
-    shotAttemptsFor = shotAttempts[0]
-    shotAttemptsAgainst = shotAttempts[1]
-    CORSISum = calculateCORSI(shotAttemptsFor,shotAttemptsAgainst)
-    CORSIAvg = calculateCORSI(shotAttemptsFor,shotAttemptsAgainst,True)
-
-    #calculate CORSI for 5v5
-    shotAttemptsFor5v5 = shotAttempts5v5[0]
-    shotAttemptsAgainst5v5 = shotAttempts5v5[1]
-    CORSI5v5Sum = calculateCORSI(shotAttemptsFor5v5,shotAttemptsAgainst5v5)
-    CORSI5v5Avg = calculateCORSI(shotAttemptsFor5v5,shotAttemptsAgainst5v5,True)
-
-    #calculate CORSI for 5v5 close situations
-    shotAttemptsFor5v5Close = shotAttemptsClose5v5[0]
-    shotAttemptsAgainst5v5Close = shotAttemptsClose5v5[1]
-    CORSI5v5CloseSum = calculateCORSI(shotAttemptsFor5v5Close,shotAttemptsAgainst5v5Close)
-    CORSI5v5CloseAvg = calculateCORSI(shotAttemptsFor5v5Close,shotAttemptsAgainst5v5Close,True)
-
-    #calculate faceoff percentage
-    FOPer = (faceOffs[0] + faceOffs[1]) and (faceOffs[0]/(faceOffs[0] + faceOffs[1])) or 0
-
-    #calculate xG share
-    xGPer = (xg[0] + xg[1]) and (xg[0]/(xg[0] + xg[1])) or 0
-    
     #the totals
-    totals = totals + [winsLoses[0],winsLoses[1],goals[0],goals[1],goalsAvg[0],goalsAvg[1],goals5v5[0],goals5v5[1],
-            goals5v5Avg[0],goals5v5Avg[1],goalsClose5v5[0],goalsClose5v5[1],goalsClose5v5Avg[0],goalsClose5v5Avg[1],
-            shots[0],shots[1],shotsAvg[0],shotsAvg[1],CORSISum,CORSIAvg,CORSI5v5Sum,CORSI5v5Avg,
-            CORSI5v5CloseSum,CORSI5v5CloseAvg,FOPer,hits[0],hits[1],hitsAvg[0],hitsAvg[1],pims[0],pims[1],pimsAvg[0],pimsAvg[1],
-            blocks[0],blocks[1],blocksAvg[0],blocksAvg[1],giveAways[0],giveAways[1],giveAwaysAvg[0],giveAwaysAvg[1],
-            takeAways[0],takeAways[1],takeAwaysAvg[0],takeAwaysAvg[1],xg[0],xg[1],xgAvg[0],xgAvg[1],xg5v5[0],xg5v5[1],
-            xg5v5Avg[0],xg5v5Avg[1],xg5v5Close[0],xg5v5Close[1],xg5v5CloseAvg[0],xg5v5CloseAvg[1],PPPer,PKPer,shootRate,saveRate,
-            shootPer,savePer,PDOPer,xGPer]
-
-    return totals
+    return [featureFormulas[name](total) for name in (featureNames if stats is None else stats)]
     
-def createFrame(df,dfOut,gameWindow,cross):
+def createFrame(df,dfOut,gameWindow,cross,games=None,stats=None):
     """Create the dataframe of games.
     
     Parameters:
         df(DataFrame) - the available game data.
-        dfOut(DataFrame) - the empty dataframe that each game will be added to.
+        dfOut(DataFrame) - the empty dataframe that each game will be added to, with the columns given by frameColumns.
         gameWindow(Int) - the number of recent games to use.
         cross(Bool) - should games from previous seasons be used?
+        games(List) - the Game_Ids to create, defaults to every game in df.
+        stats(List) - the features to create, defaults to every feature in featureNames.
     
     Returns:
         dfOut(DataFrame) - the filled dataframe that contains all games.
     """
+    if games is None:
+        games = df.Game_Id.unique()
+
     #iterate through all games
-    for i in df.Game_Id.unique():
+    for i in games:
         #home and away teams as well as the season
         away = df[df['Game_Id'] == i].Away_Team.unique()[0]
         home = df[df['Game_Id'] == i].Home_Team.unique()[0]
@@ -245,10 +193,10 @@ def createFrame(df,dfOut,gameWindow,cross):
             gameData = df[(df["Date"] < date) & (df["season"] == season)]
 
         #get away data for away teams
-        awayTeamData = collectDataForTeam(away,gameData,gameWindow)
+        awayTeamData = collectDataForTeam(away,gameData,gameWindow,stats)
 
         #get home data
-        homeTeamData = collectDataForTeam(home,gameData,gameWindow)
+        homeTeamData = collectDataForTeam(home,gameData,gameWindow,stats)
 
         #begin the row with the game, away team and home team ids.
         lst = [i,regOrOT,away,home,season,playoff]
@@ -265,15 +213,193 @@ def createFrame(df,dfOut,gameWindow,cross):
 
     return dfOut
 
-def main(cross,lst):
-    """Main method which calls other methods to create game instances.
+#base columns
+baseCols = ["Game_Id",
+            "RegOrOT",
+            "Away_Team",
+            "Home_Team",
+            "season",
+            "isPlayoff",
+            "Wins",
+            "Loses",
+            "Goals",
+            "GoalsAgainst",
+            "GoalsAvg",
+            "GoalsAgainstAvg",
+            "Goals5v5",
+            "GoalsAgainst5v5",
+            "Goals5v5Avg",
+            "GoalsAgainst5v5Avg",
+            "GoalsClose5v5",
+            "GoalsAgainstClose5v5",
+            "GoalsClose5v5Avg",
+            "GoalsAgainstClose5v5Avg",
+            "Shots",
+            "ShotsAgainst",
+            "ShotsAvg",
+            "ShotsAgainstAvg",
+            "CORSI",
+            "CORSIAvg",
+            "CORSI5v5",
+            "CORSI5v5Avg",
+            "CORSIClose5v5",
+            "CORSIClose5v5Avg",
+            "FO",
+            "Hits",
+            "HitsAgainst",
+            "HitsAvg",
+            "HitsAgainstAvg",
+            "PIMS",
+            "PIMSAgainst",
+            "PIMSAvg",
+            "PIMSAgainstAvg",
+            "Blocks",
+            "BlocksAgainst",
+            "BlocksAvg",
+            "BlocksAgainstAvg",
+            "Give",
+            "GiveAgainst",
+            "GiveAvg",
+            "GiveAgainstAvg",
+            "Take",
+            "TakeAgainst",
+            "TakeAvg",
+            "TakeAgainstAvg",
+            "XGFor",
+            "XGAgainst",
+            "XGForAvg",
+            "XGAgainstAvg",
+            "XGFor5v5",
+            "XGAgainst5v5",
+            "XGFor5v5Avg",
+            "XGAgainst5v5Avg",
+            "XGFor5v5Close",
+            "XGAgainst5v5Close",
+            "XGFor5v5CloseAvg",
+            "XGAgainst5v5CloseAvg",
+            "PP%",
+            "PK%",
+            "shRate",
+            "svRate",
+            "sh%",
+            "sv%",
+            "PDO%",
+            "xG%",
+            "Outcome"]
+
+#the features created for each game window, in the order collectDataForTeam returns them
+featureNames = baseCols[6:-1]
+
+#how each feature is made from the sums and averages of the raw stats, total(stat,avg) gives the for and against values
+featureFormulas = {
+    "Wins": lambda total: total("Winner")[0],
+    "Loses": lambda total: total("Winner")[1],
+    "Goals": lambda total: total("Score")[0],
+    "GoalsAgainst": lambda total: total("Score")[1],
+    "GoalsAvg": lambda total: total("Score",True)[0],
+    "GoalsAgainstAvg": lambda total: total("Score",True)[1],
+    "Goals5v5": lambda total: total("Score5v5")[0],
+    "GoalsAgainst5v5": lambda total: total("Score5v5")[1],
+    "Goals5v5Avg": lambda total: total("Score5v5",True)[0],
+    "GoalsAgainst5v5Avg": lambda total: total("Score5v5",True)[1],
+    "GoalsClose5v5": lambda total: total("ScoreClose5v5")[0],
+    "GoalsAgainstClose5v5": lambda total: total("ScoreClose5v5")[1],
+    "GoalsClose5v5Avg": lambda total: total("ScoreClose5v5",True)[0],
+    "GoalsAgainstClose5v5Avg": lambda total: total("ScoreClose5v5",True)[1],
+    "Shots": lambda total: total("Shots")[0],
+    "ShotsAgainst": lambda total: total("Shots")[1],
+    "ShotsAvg": lambda total: total("Shots",True)[0],
+    "ShotsAgainstAvg": lambda total: total("Shots",True)[1],
+    "CORSI": lambda total: calculateCORSI(*total("Shot_Attempts")),
+    "CORSIAvg": lambda total: calculateCORSI(*total("Shot_Attempts"),True),
+    "CORSI5v5": lambda total: calculateCORSI(*total("Shot_Attempts5v5")),
+    "CORSI5v5Avg": lambda total: calculateCORSI(*total("Shot_Attempts5v5"),True),
+    "CORSIClose5v5": lambda total: calculateCORSI(*total("Shot_AttemptsClose5v5")),
+    "CORSIClose5v5Avg": lambda total: calculateCORSI(*total("Shot_AttemptsClose5v5"),True),
+    "FO": lambda total: percentage(total("FO")[0],sum(total("FO"))),
+    "Hits": lambda total: total("Hits")[0],
+    "HitsAgainst": lambda total: total("Hits")[1],
+    "HitsAvg": lambda total: total("Hits",True)[0],
+    "HitsAgainstAvg": lambda total: total("Hits",True)[1],
+    "PIMS": lambda total: total("PIM")[0],
+    "PIMSAgainst": lambda total: total("PIM")[1],
+    "PIMSAvg": lambda total: total("PIM",True)[0],
+    "PIMSAgainstAvg": lambda total: total("PIM",True)[1],
+    "Blocks": lambda total: total("Blocks")[0],
+    "BlocksAgainst": lambda total: total("Blocks")[1],
+    "BlocksAvg": lambda total: total("Blocks",True)[0],
+    "BlocksAgainstAvg": lambda total: total("Blocks",True)[1],
+    "Give": lambda total: total("Give")[0],
+    "GiveAgainst": lambda total: total("Give")[1],
+    "GiveAvg": lambda total: total("Give",True)[0],
+    "GiveAgainstAvg": lambda total: total("Give",True)[1],
+    "Take": lambda total: total("Take")[0],
+    "TakeAgainst": lambda total: total("Take")[1],
+    "TakeAvg": lambda total: total("Take",True)[0],
+    "TakeAgainstAvg": lambda total: total("Take",True)[1],
+    "XGFor": lambda total: total("xG")[0],
+    "XGAgainst": lambda total: total("xG")[1],
+    "XGForAvg": lambda total: total("xG",True)[0],
+    "XGAgainstAvg": lambda total: total("xG",True)[1],
+    "XGFor5v5": lambda total: total("xG5v5")[0],
+    "XGAgainst5v5": lambda total: total("xG5v5")[1],
+    "XGFor5v5Avg": lambda total: total("xG5v5",True)[0],
+    "XGAgainst5v5Avg": lambda total: total("xG5v5",True)[1],
+    "XGFor5v5Close": lambda total: total("xGClose5v5")[0],
+    "XGAgainst5v5Close": lambda total: total("xGClose5v5")[1],
+    "XGFor5v5CloseAvg": lambda total: total("xGClose5v5",True)[0],
+    "XGAgainst5v5CloseAvg": lambda total: total("xGClose5v5",True)[1],
+    "PP%": lambda total: percentage(total("PPG")[0],total("PPO")[0]),
+    "PK%": lambda total: percentage(total("PPG")[1],total("PPO")[1]),
+    "shRate": lambda total: percentage(total("Score")[0],total("Shots")[0]),
+    "svRate": lambda total: savePercentage(total("Score")[1],total("Shots")[1]),
+    "sh%": lambda total: percentage(total("Score")[0],total("Shots")[0] + total("Score")[0]),
+    "sv%": lambda total: savePercentage(total("Score")[1],total("Shots")[1] + total("Score")[1]),
+    "PDO%": lambda total: (percentage(total("Score")[0],total("Shots")[0] + total("Score")[0]) +
+                           savePercentage(total("Score")[1],total("Shots")[1] + total("Score")[1])),
+    "xG%": lambda total: percentage(total("xG")[0],sum(total("xG")))
+}
+
+def frameColumns(stats=None):
+    """Get the columns of a game window frame.
 
     Parameters:
-        cross(Bool) - should data be taken from previous seasons?
-        lst(List if Ints) - list of integers representing the previous number of games used in instance creation.
+        stats(List) - the features in the frame, defaults to every feature in featureNames.
+
+    Returns:
+        columns(List) - the game columns, the features and the outcome.
+    """
+    if stats is None:
+        return list(baseCols)
+
+    return baseCols[:6] + list(stats) + baseCols[-1:]
+
+def requiredStats(manifest):
+    """Group a required-feature manifest by game window and cross mode.
+
+    Parameters:
+        manifest(List) - (stat, window, cross) triples, see ModelBundle.requiredFeatures.
+
+    Returns:
+        stats(Dict) - the features of each (window, cross) pair, in the order of featureNames.
+    """
+    wanted = {}
+    for stat, window, cross in manifest:
+        wanted.setdefault((int(window),bool(cross)),set()).add(stat)
+
+    return {job: [s for s in featureNames if s in names] for job, names in wanted.items()}
+
+def loadData(path='Database/NHLData.csv'):
+    """Read in the game database and clean it.
+
+    Parameters:
+        path(String) - the location of the game database.
+
+    Returns:
+        data(DataFrame) - the game data sorted by date with infs and NaNs filled with 0.
     """
     #read in database
-    data = pd.read_csv('Database/NHLData.csv')
+    data = pd.read_csv(path)
 
     #fill infs and NaNs with 0
     data.replace([np.inf, -np.inf], np.nan, inplace=True)
@@ -283,79 +409,90 @@ def main(cross,lst):
     data['Date'] = pd.to_datetime(data['Date'],format='%Y-%m-%d')
     data.sort_values(by='Date',inplace = True)
 
-    #base columns
-    baseCols = ["Game_Id",
-                "RegOrOT",
-                "Away_Team",
-                "Home_Team",
-                "season",
-                "isPlayoff",
-                "Wins",
-                "Loses",
-                "Goals",
-                "GoalsAgainst",
-                "GoalsAvg",
-                "GoalsAgainstAvg",
-                "Goals5v5",
-                "GoalsAgainst5v5",
-                "Goals5v5Avg",
-                "GoalsAgainst5v5Avg",
-                "GoalsClose5v5",
-                "GoalsAgainstClose5v5",
-                "GoalsClose5v5Avg",
-                "GoalsAgainstClose5v5Avg",
-                "Shots",
-                "ShotsAgainst",
-                "ShotsAvg",
-                "ShotsAgainstAvg",
-                "CORSI",
-                "CORSIAvg",
-                "CORSI5v5",
-                "CORSI5v5Avg",
-                "CORSIClose5v5",
-                "CORSIClose5v5Avg",
-                "FO",
-                "Hits",
-                "HitsAgainst",
-                "HitsAvg",
-                "HitsAgainstAvg",
-                "PIMS",
-                "PIMSAgainst",
-                "PIMSAvg",
-                "PIMSAgainstAvg",
-                "Blocks",
-                "BlocksAgainst",
-                "BlocksAvg",
-                "BlocksAgainstAvg",
-                "Give",
-                "GiveAgainst",
-                "GiveAvg",
-                "GiveAgainstAvg",
-                "Take",
-                "TakeAgainst",
-                "TakeAvg",
-                "TakeAgainstAvg",
-                "XGFor",
-                "XGAgainst",
-                "XGForAvg",
-                "XGAgainstAvg",
-                "XGFor5v5",
-                "XGAgainst5v5",
-                "XGFor5v5Avg",
-                "XGAgainst5v5Avg",
-                "XGFor5v5Close",
-                "XGAgainst5v5Close",
-                "XGFor5v5CloseAvg",
-                "XGAgainst5v5CloseAvg",
-                "PP%",
-                "PK%",
-                "shRate",
-                "svRate",
-                "sh%",
-                "sv%",
-                "PDO%",
-                "xG%",
-                "Outcome"]
+    return data
+
+def shareData(data,path='Database/NHLData.feather'):
+    """Write the cleaned game data to an uncompressed feather file so worker processes can memory-map it.
+
+    Parameters:
+        data(DataFrame) - the cleaned game data.
+        path(String) - where the shared file is written.
+
+    Returns:
+        path(String) - the location of the shared file.
+    """
+    data.reset_index(drop=True).to_feather(path,compression='uncompressed')
+
+    return path
+
+def readSharedData(path='Database/NHLData.feather'):
+    """Read the shared game data through a read-only memory map.
+
+    Parameters:
+        path(String) - the location of the shared file.
+
+    Returns:
+        data(DataFrame) - the cleaned game data.
+    """
+    import pyarrow.feather as feather
+
+    #numeric columns are backed by the page cache rather than a private copy
+    table = feather.read_table(path,memory_map=True)
+
+    return table.to_pandas(split_blocks=True)
+
+def frameFileName(gameWindow,cross):
+    """Get the csv name for a game window.
+
+    Parameters:
+        gameWindow(Int) - the number of recent games used.
+        cross(Bool) - whether games from previous seasons were used.
+
+    Returns:
+        name(String) - the location of the csv.
+    """
+    if cross:
+        return "DataFrames/" + str(gameWindow) + "Cross.csv"
+    else:
+        return "DataFrames/" + str(gameWindow) + "NoCross.csv"
+
+def createWindowFrame(path,gameWindow,cross,write=True,stats=None):
+    """Worker method which creates the frame for a single game window.
+
+    Parameters:
+        path(String) - the location of the shared game data.
+        gameWindow(Int) - the number of recent games to use.
+        cross(Bool) - should games from previous seasons be used?
+        write(Bool) - should the frame also be written to its csv?
+        stats(List) - the features to create, defaults to every feature in featureNames.
+
+    Returns:
+        newDF(DataFrame) - the filled dataframe that contains all games.
+    """
+    #attach to the shared data
+    data = readSharedData(path)
+
+    #fill the dataframe
+    newDF = createFrame(data,pd.DataFrame(columns=frameColumns(stats)),gameWindow,cross,stats=stats)
+
+    #rows are added one at a time so restore numeric types
+    newDF = newDF.infer_objects()
+
+    #create csv
+    if write:
+        newDF.to_csv(frameFileName(gameWindow,cross),index=False)
+
+    return newDF
+
+def main(cross,lst):
+    """Main method which calls other methods to create game instances.
+
+    Parameters:
+        cross(Bool) - should data be taken from previous seasons?
+        lst(List if Ints) - list of integers representing the previous number of games used in instance creation.
+    """
+    #read in database
+    data = loadData()
 
     #create dataframe
     trainDF = pd.DataFrame(columns=baseCols)
@@ -373,11 +510,54 @@ def main(cross,lst):
         newDF = createFrame(data.copy(),trainDF.copy(),i,cross)
 
         #create csv
-        if cross:
-            newDF.to_csv("DataFrames/" + str(i) + "Cross.csv",index=False)
-        else:
-            newDF.to_csv("DataFrames/" + str(i) + "NoCross.csv",index=False)
+        newDF.to_csv(frameFileName(i,cross),index=False)
+
+def runParallel(lst,crosses=(False,True),workers=None,write=True,manifest=None):
+    """Create every game window and cross combination at once using a process pool.
+
+    The cleaned data is written once to a memory-mapped file that every worker reads,
+    rather than being pickled to each process.
+
+    With a manifest only the features it lists are created, skipping any window and cross
+    combination it does not use. These frames are never written to the csvs, which keep every
+    feature for training.
+
+    Parameters:
+        lst(List of Ints) - list of integers representing the previous number of games used in instance creation.
+        crosses(Tuple of Bools) - the cross modes to create.
+        workers(Int) - the number of processes to use, defaults to one per core.
+        write(Bool) - should each frame be written to its csv?
+        manifest(List) - the (stat, window, cross) triples to create, see ModelBundle.requiredFeatures, None creates every feature.
+
+    Returns:
+        frames(Dict) - the created dataframes keyed by (game window, cross).
+    """
+    #clean the data once and share it
+    path = shareData(loadData())
+
+    #every window and cross combination is independent
+    jobs = [(i,cross) for cross in crosses for i in lst]
+    stats = dict.fromkeys(jobs)
+    if manifest is not None:
+        stats = requiredStats(manifest)
+        jobs = [job for job in jobs if job in stats]
+        write = False
+    frames = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(createWindowFrame,path,i,cross,write,stats[(i,cross)]): (i,cross) for i,cross in jobs}
+        for future in as_completed(futures):
+            i, cross = futures[future]
+            frames[(i,cross)] = future.result()
+
+            #print progress
+            if cross:
+                print("Created " + str(i) + " Games with Cross")
+            else:
+                print("Created " + str(i) + " Games with No Cross")
+
+    #return the frames in job order rather than completion order
+    return {job: frames[job] for job in jobs}
 
-main(False,[5,10,20,40,82])
-main(True,[5,10,20,40,82])
- 
+if __name__ == '__main__':
+    runParallel([5,10,20,40,82])
@@ -0,0 +1,168 @@
+import datetime
+import json
+import os
+import joblib
+import FeatureStore
+import TreeEnsemble
+
+#where bundles are stored, each version gets its own folder
+bundleDir = "Models"
+
+#increase when the contents of a bundle change
+formatVersion = 2
+
+def newVersion(season):
+    """Create a version name for bundles that predict a season.
+
+    Parameters:
+        season(Int) - the season the models will predict.
+
+    Returns:
+        version(String) - the season followed by the current time.
+    """
+    return str(season) + "-" + datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+
+def bundlePath(version,phase,compiled=False):
+    """Get the location of the bundle for a phase.
+
+    Parameters:
+        version(String) - the bundle version.
+        phase(String) - the phase of the model (Early, Mid, Late).
+        compiled(Bool) - should the location of the compiled bundle be returned?
+
+    Returns:
+        path(String) - the location of the bundle.
+    """
+    if compiled:
+        return os.path.join(bundleDir,version,phase + ".compiled.joblib")
+
+    return os.path.join(bundleDir,version,phase + ".joblib")
+
+def saveBundle(version,phase,bundle):
+    """Save the bundle for a phase, uncompressed so its arrays can be memory-mapped.
+
+    A compiled copy holding only the flattened trees is saved alongside it, which can be loaded
+    and evaluated without importing sklearn. Boosted models cannot be flattened, so their compiled
+    copy keeps the classifier.
+
+    Parameters:
+        version(String) - the bundle version.
+        phase(String) - the phase of the model (Early, Mid, Late).
+        bundle(Dict) - the selector mask, feature names, engine, bin edges, classifier and training data fingerprint.
+    """
+    os.makedirs(os.path.join(bundleDir,version),exist_ok=True)
+    bundle = dict(bundle,formatVersion=formatVersion,version=version)
+    joblib.dump(bundle,bundlePath(version,phase))
+
+    compiled = dict(bundle)
+    if hasattr(bundle['classifier'],'estimators_'):
+        del compiled['classifier']
+        compiled['flat'] = TreeEnsemble.flattenForest(bundle['classifier'])
+    joblib.dump(compiled,bundlePath(version,phase,True))
+
+def writeManifest(version,season,phases):
+    """Describe a bundle version and mark it as the latest.
+
+    Parameters:
+        version(String) - the bundle version.
+        season(Int) - the season the models predict.
+        phases(List) - the phases saved in the version.
+    """
+    manifest = {'version': version,
+                'season': season,
+                'phases': phases,
+                'formatVersion': formatVersion,
+                'created': datetime.datetime.now().isoformat(timespec='seconds')}
+
+    with open(os.path.join(bundleDir,version,"manifest.json"),'w') as f:
+        json.dump(manifest,f,indent=1)
+
+    with open(os.path.join(bundleDir,"LATEST"),'w') as f:
+        f.write(version)
+
+def requiredFeatures(bundles):
+    """Get the features used by a set of bundles as the stat, game window and cross mode that create them.
+
+    Parameters:
+        bundles(Dict) - the bundle of each phase.
+
+    Returns:
+        manifest(List) - the sorted (stat, window, cross) triples.
+    """
+    names = set(name for bundle in bundles.values() for name in bundle['features'])
+
+    return sorted(FeatureStore.parseFeature(name) for name in names)
+
+def writeFeatureManifest(version,manifest):
+    """Save the features a bundle version uses, so feature builds can create only those.
+
+    Parameters:
+        version(String) - the bundle version.
+        manifest(List) - the (stat, window, cross) triples, see requiredFeatures.
+    """
+    with open(os.path.join(bundleDir,version,"features.json"),'w') as f:
+        json.dump([list(triple) for triple in manifest],f,indent=1)
+
+def readFeatureManifest(version=None):
+    """Read the features a bundle version uses.
+
+    Parameters:
+        version(String) - the bundle version, defaults to the latest.
+
+    Returns:
+        manifest(List) - the (stat, window, cross) triples.
+    """
+    if version is None:
+        version = latestVersion()
+
+    with open(os.path.join(bundleDir,version,"features.json")) as f:
+        return [tuple(triple) for triple in json.load(f)]
+
+def latestVersion():
+    """Get the most recently exported bundle version.
+
+    Returns:
+        version(String) - the bundle version.
+    """
+    with open(os.path.join(bundleDir,"LATEST")) as f:
+        return f.read().strip()
+
+def loadBundles(version=None,compiled=False):
+    """Load every phase of a bundle version with memory-mapped arrays.
+
+    Parameters:
+        version(String) - the bundle version, defaults to the latest.
+        compiled(Bool) - should the compiled bundles, with flattened trees instead of classifiers, be loaded?
+
+    Returns:
+        bundles(Dict) - the bundle of each phase.
+    """
+    if version is None:
+        version = latestVersion()
+
+    with open(os.path.join(bundleDir,version,"manifest.json")) as f:
+        manifest = json.load(f)
+
+    if manifest['formatVersion'] != formatVersion:
+        raise ValueError("Bundle " + version + " has format " + str(manifest['formatVersion']) + ", expected " + str(formatVersion))
+
+    return {phase: joblib.load(bundlePath(version,phase,compiled),mmap_mode='r') for phase in manifest['phases']}
+
+def predictProba(bundle,X):
+    """Get the probability of a home win for games using a bundle.
+
+    Parameters:
+        bundle(Dict) - a loaded bundle.
+        X(Array) - the games, with one column per feature in bundle['features'].
+
+    Returns:
+        proba(Array) - the probability the home team wins each game.
+    """
+    #models trained on binned features need the same bins
+    if bundle.get('edges') is not None:
+        X = FeatureStore.applyBins(X,bundle['edges'])
+
+    if 'flat' in bundle:
+        return TreeEnsemble.predictProba(bundle['flat'],X)[:,1]
+
+    return bundle['classifier'].predict_proba(X)[:,1]
@@ -0,0 +1,62 @@
+import os
+import joblib
+import FeatureStore
+import Profiler
+
+def load(kind,key):
+    """Load a cached result, memory-mapping any arrays it contains.
+
+    Parameters:
+        kind(String) - the type of result being cached.
+        key(String) - the fingerprint of the result's inputs.
+
+    Returns:
+        value - the cached result, or None if nothing readable is cached for the key.
+    """
+    path = FeatureStore.cacheFile(kind,key,'.joblib')
+    if not os.path.exists(path):
+        return None
+
+    #an entry that cannot be unpickled, whatever the error, is treated as missing and computed again
+    try:
+        return joblib.load(path,mmap_mode='r')
+    except Exception:
+        return None
+
+def save(kind,key,value):
+    """Cache a result on disk, moving it into place once fully written so other processes never read a partial file.
+
+    Parameters:
+        kind(String) - the type of result being cached.
+        key(String) - the fingerprint of the result's inputs.
+        value - the result to cache.
+
+    Returns:
+        value - the result that was cached.
+    """
+    path = FeatureStore.cacheFile(kind,key,'.joblib')
+    temporary = path + '.' + str(os.getpid())
+    joblib.dump(value,temporary)
+    os.replace(temporary,path)
+
+    return value
+
+def memoize(kind,key,compute):
+    """Return a cached result, computing and caching it first if needed.
+
+    Parameters:
+        kind(String) - the type of result being cached.
+        key(String) - the fingerprint of the result's inputs.
+        compute(Function) - creates the result when it is not cached.
+
+    Returns:
+        value - the cached or newly computed result.
+    """
+    value = load(kind,key)
+    if value is None:
+        Profiler.count(kind + ' cache misses')
+        value = save(kind,key,compute())
+    else:
+        Profiler.count(kind + ' cache hits')
+
+    return value
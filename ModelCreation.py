@@ -1,10 +1,75 @@
-import pandas as pd
-from sklearn.ensemble import ExtraTreesClassifier
+from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier
 from sklearn.metrics import log_loss, accuracy_score, make_scorer, roc_auc_score, f1_score
-from sklearn.model_selection import cross_val_score, cross_val_predict
-from sklearn.feature_selection import SelectPercentile, mutual_info_classif
-from sklearn.model_selection import RandomizedSearchCV
+from sklearn.model_selection import cross_validate, cross_val_predict, StratifiedKFold
+from sklearn.feature_selection import SelectKBest, mutual_info_classif
+from sklearn.model_selection import RandomizedSearchCV, train_test_split, ParameterSampler
+from sklearn.experimental import enable_halving_search_cv
+from sklearn.model_selection import HalvingGridSearchCV
 import numpy as np
+import hashlib
+import time
+from functools import partial
+from joblib import Parallel, delayed, effective_n_jobs
+import FeatureStore
+import ModelCache
+import ModelBundle
+import Profiler
+
+#the estimator trained for each phase, either 'extratrees' or 'histgb'
+phaseEngines = {'Early': 'extratrees', 'Mid': 'extratrees', 'Late': 'extratrees'}
+
+#the parameters of each engine for each phase, the extratrees parameters were selected with runTests
+phaseParams = {
+    'extratrees': {
+        'Early': {'random_state': 42, 'n_estimators': 250, 'min_samples_split': 61, 'min_samples_leaf': 11, 'max_features': 48},
+        'Mid': {'random_state': 42, 'n_estimators': 75, 'min_samples_split': 94, 'min_samples_leaf': 31, 'max_features': 13},
+        'Late': {'random_state': 42, 'n_estimators': 350, 'min_samples_split': 31, 'min_samples_leaf': 87, 'max_features': 32}
+    },
+    'histgb': {
+        'Early': {'random_state': 42, 'learning_rate': 0.05, 'max_leaf_nodes': 8, 'min_samples_leaf': 40, 'l2_regularization': 1.0},
+        'Mid': {'random_state': 42, 'learning_rate': 0.05, 'max_leaf_nodes': 8, 'min_samples_leaf': 80, 'l2_regularization': 1.0},
+        'Late': {'random_state': 42, 'learning_rate': 0.05, 'max_leaf_nodes': 8, 'min_samples_leaf': 40, 'l2_regularization': 1.0}
+    }
+}
+
+def makeClassifier(engine,params=None,n_jobs=None):
+    """Create the estimator of an engine.
+
+    The 'histgb' engine is a HistGradientBoostingClassifier that stops adding trees once the log loss
+    of a held out tenth of the games stops improving. It is meant to be trained on features binned by
+    FeatureStore.applyBins, so the binning is done once rather than in every fit.
+
+    Parameters:
+        engine(String) - either 'extratrees' or 'histgb'.
+        params(Dict) - the parameters of the estimator.
+        n_jobs(Int) - the number of threads building trees, only used by extratrees.
+
+    Returns:
+        classifier - the unfitted estimator.
+    """
+    params = params or {}
+
+    if engine == 'extratrees':
+        return ExtraTreesClassifier(**params,n_jobs=n_jobs)
+    elif engine == 'histgb':
+        return HistGradientBoostingClassifier(**dict({'max_iter': 1000},**params),early_stopping=True,scoring='loss',
+                                              validation_fraction=0.1,n_iter_no_change=20)
+
+    raise ValueError("Unknown engine " + str(engine) + ", use either 'extratrees' or 'histgb'")
+
+def treesBuilt(classifier):
+    """Get the number of trees in a fitted estimator.
+
+    Parameters:
+        classifier - a fitted ExtraTreesClassifier or HistGradientBoostingClassifier.
+
+    Returns:
+        trees(Int) - the number of trees.
+    """
+    if hasattr(classifier,'estimators_'):
+        return len(classifier.estimators_)
+
+    return int(classifier.n_iter_)
 
 def removeEarlyGames(df,games=20):
     """Remove the first x games for each team in a season.
@@ -16,28 +81,7 @@ def removeEarlyGames(df,games=20):
     Returns:
         df(Dataframe) - the dataframe with the given number of games removed."""
     
-    #get all team names
-    teams = df.Home_Team.unique()
-
-    #get all seasons
-    seasons = df.season.unique()
-
-    #where the games that will be removed are stored
-    gamesToRemove = set()
-
-    for i in seasons:
-        #get the games from a given season
-        season = df[df["season"] == i].sort_values("Game_Id")
-        for j in teams:
-            #get the teams first x games
-            earlyGames = season[(season["Away_Team"] == j) | (season["Home_Team"] == j)].head(games)
-            gameList = earlyGames.Game_Id.unique()
-            gamesToRemove.update(gameList)
-    
-    #remove games from the dataframe
-    df = df[~df.Game_Id.isin(list(gamesToRemove))]
-
-    return df
+    return df[FeatureStore.phaseLabels(df,early=games) != 'Early']
 
 def UseOnlyEarlyGames(df,games=20):
     """Retrieve only the first x games for each team in a season.
@@ -49,28 +93,7 @@ def UseOnlyEarlyGames(df,games=20):
     Returns:
         df(Dataframe) - the dataframe the retrieved games."""
     
-    #get all team names
-    teams = df.Home_Team.unique()
-
-    #get all seasons
-    seasons = df.season.unique()
-
-    #where the games that will be removed are stored
-    gamesToRemove = set()
-
-    for i in seasons:
-        #get the games from a given season
-        season = df[df["season"] == i].sort_values("Game_Id")
-        for j in teams:
-            #get the teams first x games
-            earlyGames = season[(season["Away_Team"] == j) | (season["Home_Team"] == j)].head(games)
-            gameList = earlyGames.Game_Id.unique()
-            gamesToRemove.update(gameList)
-    
-    #remove games from the dataframe
-    df = df[df.Game_Id.isin(list(gamesToRemove))]
-
-    return df
+    return df[FeatureStore.phaseLabels(df,early=games) == 'Early']
 
 def UseOnlyMidGames(df,games=42):
     """Retrieve only the middle x games for each team in a season.
@@ -82,30 +105,7 @@ def UseOnlyMidGames(df,games=42):
     Returns:
         df(Dataframe) - the dataframe the retrieved games."""
     
-    #get all team names
-    teams = df.Home_Team.unique()
-
-    #get all seasons
-    seasons = df.season.unique()
-
-    #remove games from the dataframe
-    df = removeEarlyGames(df)
-
-    gamesToRemove = set()
-    
-    for i in seasons:
-        #get the games from a given season
-        season = df[df["season"] == i].sort_values("Game_Id")
-        for j in teams:
-            #get the teams first x games
-            earlyGames = season[(season["Away_Team"] == j) | (season["Home_Team"] == j)].head(games)
-            gameList = earlyGames.Game_Id.unique()
-            gamesToRemove.update(gameList)
-    
-    #remove games from the dataframe
-    df = df[df.Game_Id.isin(list(gamesToRemove))]
-
-    return df
+    return df[FeatureStore.phaseLabels(df,mid=games) == 'Mid']
 
 def UseOnlyLateGames(df):
     """Retrieve only late games for each team in a season.
@@ -116,230 +116,769 @@ def UseOnlyLateGames(df):
     Returns:
         df(Dataframe) - the dataframe the retrieved games."""
     
-    #get the early and mid games
-    earlyGames = UseOnlyEarlyGames(df)
-    midGames = UseOnlyMidGames(df)
+    return df[FeatureStore.phaseLabels(df) == 'Late']
+
+def removeRedundantFeatures(trainingX,names,threshold=0.999,block=128):
+    """Find the features left after removing constant, duplicated and near perfectly correlated columns.
+
+    The decision only depends on the training features, so it is cached on disk by their fingerprint.
+
+    Parameters:
+        trainingX(Array) - the training features.
+        names(List) - the name of each feature.
+        threshold(Float) - the absolute correlation at which a column is considered redundant.
+        block(Int) - the number of columns correlated at a time.
 
-    #remove early and mid games from the data
-    df = df[~df.Game_Id.isin(earlyGames.Game_Id.unique())]
-    df = df[~df.Game_Id.isin(midGames.Game_Id.unique())]
+    Returns:
+        kept(List) - the names of the features to keep, in their original order.
+    """
+    #reuse a previous decision for the same data
+    key = FeatureStore.fingerprint(trainingX,names,threshold)
+    path = FeatureStore.cacheFile('redundancy',key)
+    kept = FeatureStore.readJSON(path)
+    if kept is not None:
+        Profiler.count('redundancy cache hits')
+        return kept
+
+    Profiler.count('redundancy cache misses')
+    values = trainingX.astype('float64')
+
+    #drop zero variance columns
+    candidates = [j for j in range(values.shape[1]) if np.ptp(values[:,j]) > 0]
+
+    #drop exact duplicates by hashing the bytes of each column
+    seen = {}
+    unique = []
+    for j in candidates:
+        column = np.ascontiguousarray(values[:,j])
+        digest = hashlib.blake2b(column.data,digest_size=16).digest()
+        if digest in seen and np.array_equal(values[:,seen[digest]],column):
+            continue
+        seen[digest] = j
+        unique.append(j)
+
+    #standardize so a dot product gives the correlation
+    z = values[:,unique]
+    z = (z - z.mean(axis=0)) / z.std(axis=0)
+    z /= np.sqrt(z.shape[0])
+
+    #compare each block with the columns already kept, then within itself
+    kept = []
+    for start in range(0,len(unique),block):
+        current = list(range(start,min(start + block,len(unique))))
+        if kept:
+            against = np.abs(z[:,current].T @ z[:,kept]).max(axis=1)
+            current = [j for j, c in zip(current,against) if c < threshold]
+        if not current:
+            continue
+        within = np.abs(z[:,current].T @ z[:,current])
+        keptInBlock = []
+        for a in range(len(current)):
+            if all(within[a,b] < threshold for b in keptInBlock):
+                keptInBlock.append(a)
+        kept.extend(current[a] for a in keptInBlock)
+
+    kept = [names[unique[j]] for j in kept]
+
+    #store the decision
+    FeatureStore.writeJSON(path,kept)
+
+    return kept
+
+def readTrials(phase):
+    """Read the trials logged by earlier halving searches for a phase.
+
+    Parameters:
+        phase(String) - the phase of the model (Early, Mid, Late).
+
+    Returns:
+        trials(List) - the logged trials, each with its parameters, score and resources.
+    """
+    trials = FeatureStore.readJSON(FeatureStore.cacheFile('tuning',str(phase)))
+
+    return [] if trials is None else trials
+
+def writeTrials(phase,trials):
+    """Write the trial log for a phase.
+
+    Parameters:
+        phase(String) - the phase of the model (Early, Mid, Late).
+        trials(List) - the trials to log.
+    """
+    FeatureStore.writeJSON(FeatureStore.cacheFile('tuning',str(phase)),trials,indent=1)
+
+def countSearchFits(search):
+    """Count the models and trees fit by a finished hyperparameter search, including the final refit.
+
+    Parameters:
+        search(BaseSearchCV) - the fitted search.
+    """
+    trials = search.cv_results_['params']
+    Profiler.count('fits',len(trials) * search.n_splits_ + 1)
+    Profiler.count('trees',treesBuilt(search.best_estimator_))
+    if 'n_estimators' in search.best_params_:
+        Profiler.count('trees',sum(p['n_estimators'] for p in trials) * search.n_splits_)
 
-    return df
+def parameterTuning(classifier,trainX,trainY,search='random',n_jobs=1,phase=None,candidates=200,warmStart=20):
+    """Tune the parameters of an ExtraTreesClassifier or HistGradientBoostingClassifier.
 
-def parameterTuning(classifier,trainX,trainY):
-    """Use RandomizedSearchCV to tune the parameters of an ExtraTreesClassifier.
+    The 'random' search is a RandomizedSearchCV. The 'halving' search runs successive halving over
+    the same space, so most candidates are only fit on a small share of the games, and logs every
+    trial so later searches for the phase start from the best earlier candidates.
 
     Parameters:
-        classifier(ExtraTreesClassifier) - an ExtraTreesClassifier instance.
+        classifier - an ExtraTreesClassifier or HistGradientBoostingClassifier instance.
         trainX(Dataframe) - the training features.
         trainY(Dataframe) - the training targets.
+        search(String) - either 'random' or 'halving'.
+        n_jobs(Int) - the number of candidates fit at once.
+        phase(String) - the phase of the model and engine, used to name the trial log of a halving search.
+        candidates(Int) - the number of new candidates sampled.
+        warmStart(Int) - the number of the best logged candidates searched again.
 
     Returns:
         search.best_params_(Dict) - the best parameters found by the search
     """
 
     #the parameter grid to search
-    params = {
-        'n_estimators': range(50,750,25),
-        'max_features': range(1,trainX.shape[1],1),
-        'min_samples_leaf': range(1,100,1),
-        'min_samples_split': range(2,100,1),
-        'random_state':[42]
-    }
+    if isinstance(classifier,HistGradientBoostingClassifier):
+        params = {
+            'learning_rate': [0.01,0.02,0.05,0.1,0.2],
+            'max_leaf_nodes': range(4,64,2),
+            'min_samples_leaf': range(5,200,5),
+            'l2_regularization': [0.0,0.1,1.0,10.0],
+            'random_state':[42]
+        }
+    else:
+        params = {
+            'n_estimators': range(50,750,25),
+            'max_features': range(1,trainX.shape[1],1),
+            'min_samples_leaf': range(1,100,1),
+            'min_samples_split': range(2,100,1),
+            'random_state':[42]
+        }
 
     #create a log loss scorer
     logLoss = make_scorer(score_func=log_loss, greater_is_better=False)
 
-    #create the randomized search and fit the model
-    tuner = RandomizedSearchCV(classifier,params,cv=10,scoring=logLoss,n_iter=200,random_state=42)
-    search = tuner.fit(trainX,trainY)
+    if search == 'random':
+        #create the randomized search and fit the model
+        tuner = RandomizedSearchCV(classifier,params,cv=10,scoring=logLoss,n_iter=candidates,random_state=42,n_jobs=n_jobs)
+        with Profiler.step('random search',shape=Profiler.shape(trainX),candidates=candidates):
+            search = tuner.fit(trainX,trainY)
+            countSearchFits(search)
+
+        return search.best_params_
+
+    #start from the best logged trials that still fit the number of features
+    trials = readTrials(phase)
+    ranked = sorted(trials,key=lambda t: (t['resources'],t['score']),reverse=True)
+    previous = [t['params'] for t in ranked if t['params'].get('max_features',0) < trainX.shape[1]][:warmStart]
+
+    #add newly sampled candidates, skipping any already included
+    grid = []
+    for p in previous + list(ParameterSampler(params,candidates,random_state=42)):
+        if {k: [v] for k, v in p.items()} not in grid:
+            grid.append({k: [v] for k, v in p.items()})
+
+    #candidates are fit on more games each round and only the best third go on
+    tuner = HalvingGridSearchCV(classifier,grid,cv=10,scoring=logLoss,factor=3,n_jobs=n_jobs,random_state=42)
+    with Profiler.step('halving search',shape=Profiler.shape(trainX),candidates=len(grid)):
+        search = tuner.fit(trainX,trainY)
+        countSearchFits(search)
+
+    #log every trial with the number of games it was scored on
+    results = search.cv_results_
+    for i in range(len(results['params'])):
+        trials.append({'params': {k: v.item() if hasattr(v,'item') else v for k, v in results['params'][i].items()},
+                       'score': float(results['mean_test_score'][i]),
+                       'resources': int(results['n_resources'][i])})
+    writeTrials(phase,trials)
 
     return search.best_params_
 
-def chooseModel(season,model):
-    """Create the given model and predict the given season
+def precomputedScores(scores,X,y):
+    """Score function that returns scores computed beforehand, letting a selector reuse cached scores.
+
+    Parameters:
+        scores(Array) - the score of every feature.
+        X(Array) - the features, unused.
+        y(Array) - the targets, unused.
+
+    Returns:
+        scores(Array) - the score of every feature.
+    """
+    return scores
+
+def scoreColumns(trainingX,trainingY,columns,seed=0):
+    """Compute the mutual information of a group of features with the target.
+
+    Every column gets its own random state from the seed and its index, so a score does not
+    depend on which other columns are in the group, and any number of processes gives the
+    same scores.
+
+    Parameters:
+        trainingX(Array) - the training features.
+        trainingY(Array) - the training targets.
+        columns(Array) - the features to score.
+        seed(Int) - the random state of the mutual information estimate.
+
+    Returns:
+        scores(Array) - the mutual information of each feature in the group.
+    """
+    return np.array([mutual_info_classif(trainingX[:,[j]],trainingY,random_state=columnSeed(seed,j))[0] for j in columns])
+
+def columnSeed(seed,column):
+    """Derive the random state used to score a single column.
+
+    Parameters:
+        seed(Int) - the random state of the mutual information estimate.
+        column(Int) - the index of the column.
+
+    Returns:
+        state(Int) - the random state of the column.
+    """
+    return int(np.random.SeedSequence([seed,int(column)]).generate_state(1)[0])
+
+def scoreFeatures(trainingX,trainingY,seed=0,n_jobs=1,sample=None):
+    """Compute the mutual information of every feature with the target, in parallel across cores.
+
+    Parameters:
+        trainingX(Array) - the training features.
+        trainingY(Array) - the training targets.
+        seed(Int) - the random state of the mutual information estimate.
+        n_jobs(Int) - the number of processes scoring features at once.
+        sample(Int) - the size of a stratified subsample to score on, None uses every game.
+
+    Returns:
+        scores(Array) - the mutual information of every feature.
+    """
+    #score a stratified subsample of the games if requested
+    if sample is not None and sample < trainingY.shape[0]:
+        rows = train_test_split(np.arange(trainingY.shape[0]),train_size=sample,stratify=trainingY,random_state=seed)[0]
+        rows.sort()
+        trainingX, trainingY = trainingX[rows], trainingY[rows]
+
+    #each process scores its own group of columns, joblib memory-maps the matrix for the processes and removes it afterwards
+    groups = [g for g in np.array_split(np.arange(trainingX.shape[1]),effective_n_jobs(n_jobs)) if len(g)]
+    scores = Parallel(n_jobs=n_jobs)(delayed(scoreColumns)(trainingX,trainingY,g,seed) for g in groups)
+
+    return np.concatenate(scores)
+
+def selectFeatures(trainingX,trainingY,k,seed=0,season=None,phase=None,n_jobs=1,sample=None):
+    """Fit a mutual information feature selector.
+
+    The expensive scores are cached per season cutoff, phase and data fingerprint, so later runs
+    only redo the cheap cut of the best features.
+
+    Parameters:
+        trainingX(Array) - the training features.
+        trainingY(Array) - the training targets.
+        k(Int) - the number of features to select.
+        seed(Int) - the random state of the mutual information estimate.
+        season(Int) - the season being predicted, used to label the cached scores.
+        phase(String) - the phase of the model, used to label the cached scores.
+        n_jobs(Int) - the number of processes scoring features at once.
+        sample(Int) - the size of a stratified subsample to score on, None uses every game.
+
+    Returns:
+        selector(SelectKBest) - the fitted selector.
+    """
+    key = str(season) + '-' + str(phase) + '-' + FeatureStore.fingerprint(trainingX,trainingY,seed,sample,'column seeds')
+    scores = ModelCache.memoize('mi',key,lambda: scoreFeatures(trainingX,trainingY,seed,n_jobs,sample))
+
+    return SelectKBest(score_func=partial(precomputedScores,np.asarray(scores)),k=k).fit(trainingX,trainingY)
+
+def splitCores(cores,jobs):
+    """Divide a core budget between concurrent jobs so nested parallelism does not oversubscribe.
+
+    Parameters:
+        cores(Int) - the total number of cores to use, -1 for every core.
+        jobs(Int) - the number of jobs that could run at once.
+
+    Returns:
+        processes(Int) - the number of jobs to run at once.
+        perJob(Int) - the number of cores each job may use.
+    """
+    cores = effective_n_jobs(cores)
+    processes = max(1,min(cores,jobs))
+
+    return processes, max(1,cores // processes)
+
+def trainClassifier(params,trainingX,trainingY,n_jobs=1,evaluation='cv',engine='extratrees'):
+    """Fit a classifier and get probabilities for the training games it was not trained on.
+
+    With 'cv' the probabilities come from 10-fold cross validation and the classifier is then fit on
+    all the training data. With 'oob' a single bootstrapped ExtraTreesClassifier is fit and its
+    out-of-bag probabilities are used instead, avoiding the 10 extra forests. With 'fit' only the
+    final classifier is fit, for when the probabilities come from selectionCV.
+
+    Parameters:
+        params(Dict) - the parameters of the classifier.
+        trainingX(Array) - the training features.
+        trainingY(Array) - the training targets.
+        n_jobs(Int) - the number of cores to use, shared between folds and trees.
+        evaluation(String) - either 'cv', 'oob' or 'fit'.
+        engine(String) - the estimator, see makeClassifier.
+
+    Returns:
+        classifier - the fitted classifier.
+        cvProbs(Array) - the cross validation or out-of-bag probabilities, None with 'fit'.
+    """
+    if evaluation == 'fit':
+        classifier = makeClassifier(engine,params,effective_n_jobs(n_jobs))
+        with Profiler.step('final fit',shape=Profiler.shape(trainingX)):
+            classifier.fit(trainingX,trainingY)
+        if engine == 'extratrees':
+            classifier.set_params(n_jobs=None)
+        Profiler.count('fits')
+        Profiler.count('trees',treesBuilt(classifier))
+
+        return classifier, None
+
+    if evaluation == 'oob':
+        if engine != 'extratrees':
+            raise ValueError("Out-of-bag evaluation needs the bagged 'extratrees' engine, not " + str(engine))
+
+        classifier = ExtraTreesClassifier(**params,bootstrap=True,oob_score=True,n_jobs=effective_n_jobs(n_jobs))
+        with Profiler.step('oob fit',shape=Profiler.shape(trainingX)):
+            classifier.fit(trainingX,trainingY)
+        Profiler.count('fits')
+        Profiler.count('trees',params['n_estimators'])
+
+        #games that were in every bootstrap sample have no estimate, sklearn leaves their probabilities at 0, use the base rate for them
+        cvProbs = classifier.oob_decision_function_
+        missing = (cvProbs.sum(axis=1) == 0) | np.isnan(cvProbs).any(axis=1)
+        cvProbs[missing] = [1 - trainingY.mean(),trainingY.mean()]
+        classifier.set_params(n_jobs=None)
+
+        return classifier, cvProbs
+
+    #folds run in parallel first and any remaining cores build trees within each fold
+    folds, trees = splitCores(n_jobs,10)
+    classifier = makeClassifier(engine,params,trees)
+
+    #get cross validation results, joblib memory-maps the matrix once for every fold process
+    with Profiler.step('cross validation',shape=Profiler.shape(trainingX)):
+        cvProbs = cross_val_predict(classifier,trainingX,trainingY,cv=10,method='predict_proba',n_jobs=folds)
+
+    #fit model, using every core for trees
+    with Profiler.step('final fit',shape=Profiler.shape(trainingX)):
+        if engine == 'extratrees':
+            classifier.set_params(n_jobs=effective_n_jobs(n_jobs))
+        classifier.fit(trainingX,trainingY)
+        if engine == 'extratrees':
+            classifier.set_params(n_jobs=None)
+    Profiler.count('fits',11)
+    Profiler.count('trees',treesBuilt(classifier) * 11)
+
+    return classifier, cvProbs
+
+def fitModel(params,trainingX,trainingY,n_jobs=1,evaluation='cv',engine='extratrees'):
+    """Fit a classifier with trainClassifier, caching the result.
+
+    Fitted models are cached by the training data, parameters, evaluation and engine, so repeated
+    runs reuse them.
+
+    Parameters:
+        params(Dict) - the parameters of the classifier.
+        trainingX(Array) - the training features.
+        trainingY(Array) - the training targets.
+        n_jobs(Int) - the number of cores to use, shared between folds and trees.
+        evaluation(String) - either 'cv', 'oob' or 'fit'.
+        engine(String) - the estimator, see makeClassifier.
+
+    Returns:
+        classifier - the fitted classifier.
+        cvProbs(Array) - the cross validation or out-of-bag probabilities, None with 'fit'.
+    """
+    key = FeatureStore.fingerprint(trainingX,trainingY,params,'cv10' if evaluation == 'cv' else evaluation,engine)
+
+    return ModelCache.memoize('models',key,lambda: trainClassifier(params,trainingX,trainingY,n_jobs,evaluation,engine))
+
+def fitFold(params,candidateX,trainingY,train,test,k,seed=0,dataKey=None,n_jobs=1,engine='extratrees',sample=None):
+    """Select features on the training games of one fold, fit a classifier on them and predict the held out games.
+
+    The mutual information scores of the fold are cached by the data fingerprint and the games in
+    the fold, so any later run with the same folds, whatever its parameters, reuses them.
+
+    Parameters:
+        params(Dict) - the parameters of the classifier.
+        candidateX(Array) - the training features that feature selection chooses from.
+        trainingY(Array) - the training targets.
+        train(Array) - the rows the fold is trained on.
+        test(Array) - the rows held out of the fold.
+        k(Int) - the number of features to select.
+        seed(Int) - the random state of the mutual information estimate.
+        dataKey(String) - the fingerprint of candidateX and trainingY.
+        n_jobs(Int) - the number of cores used to score features and build trees.
+        engine(String) - the estimator, see makeClassifier.
+        sample(Int) - the size of a stratified subsample that feature scores are estimated on, None uses every game.
+
+    Returns:
+        proba(Array) - the probabilities of the held out games.
+        trees(Int) - the number of trees built.
+    """
+    trainX, trainY = candidateX[train], trainingY[train]
+
+    #select features with the games of the fold only
+    key = FeatureStore.fingerprint(dataKey,train,seed,sample,'column seeds')
+    scores = ModelCache.memoize('foldmi',key,lambda: scoreFeatures(trainX,trainY,seed,n_jobs,sample))
+    selector = SelectKBest(score_func=partial(precomputedScores,np.asarray(scores)),k=k).fit(trainX,trainY)
+    trainX, testX = selector.transform(trainX), selector.transform(candidateX[test])
+
+    #the histogram engine gets bins from the games of the fold as well
+    if engine == 'histgb':
+        edges = FeatureStore.binEdges(trainX)
+        trainX, testX = FeatureStore.applyBins(trainX,edges), FeatureStore.applyBins(testX,edges)
+
+    classifier = makeClassifier(engine,params,n_jobs)
+    classifier.fit(trainX,trainY)
+
+    return classifier.predict_proba(testX), treesBuilt(classifier)
+
+def selectionCV(params,candidateX,trainingY,k,seed=0,n_jobs=1,engine='extratrees',folds=10,sample=None):
+    """Get cross validation probabilities with feature selection done inside every fold.
+
+    Selecting features on every game before cross validation lets the held out games choose the
+    features they are scored with, which makes the results optimistic. Here each fold selects its
+    own features from the games it trains on. The folds are the same as those of cross_val_predict.
+
+    Parameters:
+        params(Dict) - the parameters of the classifier.
+        candidateX(Array) - the training features that feature selection chooses from.
+        trainingY(Array) - the training targets.
+        k(Int) - the number of features each fold selects.
+        seed(Int) - the random state of the mutual information estimate.
+        n_jobs(Int) - the number of cores to use, shared between folds and the work within each fold.
+        engine(String) - the estimator, see makeClassifier.
+        folds(Int) - the number of folds.
+        sample(Int) - the size of a stratified subsample that feature scores are estimated on, None uses every game.
+
+    Returns:
+        cvProbs(Array) - the cross validation probabilities.
+    """
+    splits = list(StratifiedKFold(folds).split(candidateX,trainingY))
+    dataKey = FeatureStore.fingerprint(candidateX,trainingY)
+
+    #folds run in parallel, joblib memory-maps the matrix once for every fold process
+    processes, perFold = splitCores(n_jobs,folds)
+
+    calls = [(params,candidateX,trainingY,train,test,k,seed,dataKey,perFold,engine,sample) for train, test in splits]
+    if Profiler.enabled:
+        collected = Parallel(n_jobs=processes)(delayed(Profiler.collect)(fitFold,*args) for args in calls)
+        for result, summary in collected:
+            Profiler.merge(summary)
+        results = [result for result, summary in collected]
+    else:
+        results = Parallel(n_jobs=processes)(delayed(fitFold)(*args) for args in calls)
+
+    cvProbs = np.zeros((len(trainingY),2))
+    for (train, test), (proba, trees) in zip(splits,results):
+        cvProbs[test] = proba
+        Profiler.count('fits')
+        Profiler.count('trees',trees)
+
+    return cvProbs
+
+def candidateFeatures(season,model,dataset):
+    """Get the training games for a model with constant and redundant features removed.
 
     Parameters:
         season(Int) - the season to predict.
         model(String) - the model to be created (Early, Mid, Late).
+        dataset(GameDataset) - the loaded games.
 
     Returns:
-        proba(List) - a list of probabilities from the model.
-        preds(List) - a list of outcomes predicted by the model.
-        testingY(List) - a list that contains the actual outcome from the model
+        candidateX(Array) - the training features that feature selection chooses from.
+        trainingY(Array) - the training outcomes.
+        keptColumns(List) - the columns of the dataset in candidateX.
+        k(Int) - the number of features to select.
     """
-    #read in the csv
-    df = pd.read_csv("Dataframes/CombinedFrame.csv")
+    #regulation games from earlier seasons are used for training
+    with Profiler.step('phase split'):
+        trainingX, trainingY = dataset.split(season,model,'train')
 
-    #create training data
-    trainingFrame = df[(df['season'] < season)]
+    #remove constant and redundant features, keeping the 10th percentile of the full feature count
+    k = int(trainingX.shape[1] * 10 / 100)
+    with Profiler.step('redundancy',shape=Profiler.shape(trainingX)):
+        kept = removeRedundantFeatures(trainingX,dataset.features)
+        keptColumns = [dataset.features.index(c) for c in kept]
+        trainingX = trainingX[:,keptColumns]
 
-    #select games based off model
-    if model == 'Early':
-        trainingFrame = UseOnlyEarlyGames(trainingFrame)
-    elif model == 'Mid':
-        trainingFrame = UseOnlyMidGames(trainingFrame)
-    elif model == 'Late':
-        trainingFrame = UseOnlyLateGames(trainingFrame)
-    else:
-        print("Error: use either 'Early', 'Mid', or 'Late' for model parameter.")
-        return
-    
-    #remove OT games, drop unneeded columns, and replace NaNs/Inf
-    trainingFrame = trainingFrame[trainingFrame['RegOrOT'] != 'OT']
-    trainingFrame = trainingFrame.drop(['Game_Id','RegOrOT','Away_Team','Home_Team','season','isPlayoff'], axis=1) 
-    trainingFrame.replace([np.inf, -np.inf], np.nan, inplace=True)
-    trainingFrame = trainingFrame.fillna(0)
+    return trainingX, trainingY, keptColumns, min(k,len(kept))
 
-    #separate x and y for the training set
-    trainingX = trainingFrame[trainingFrame.columns.difference(['Outcome'])]
-    trainingY = trainingFrame['Outcome'].astype('int32')
+def prepareFeatures(season,model,dataset,seed=0,n_jobs=1,candidates=None,sample=None):
+    """Get the training games for a model and select their features.
 
-    #create the model
-    classifier = ExtraTreesClassifier(random_state=42)
+    Parameters:
+        season(Int) - the season to predict.
+        model(String) - the model to be created (Early, Mid, Late).
+        dataset(GameDataset) - the loaded games.
+        seed(Int) - the random state used by feature selection.
+        n_jobs(Int) - the number of cores used to score features.
+        candidates(Tuple) - the result of candidateFeatures, computed when not given.
+        sample(Int) - the size of a stratified subsample that feature scores are estimated on, None uses every game.
+
+    Returns:
+        trainingX(Array) - the selected training features.
+        trainingY(Array) - the training outcomes.
+        columns(List) - the columns of the dataset that were selected.
+    """
+    if candidates is None:
+        candidates = candidateFeatures(season,model,dataset)
+    trainingX, trainingY, keptColumns, k = candidates
 
     #perform feature selection
-    selector = SelectPercentile(score_func=mutual_info_classif,percentile=10).fit(trainingX,trainingY)
+    with Profiler.step('feature selection',shape=Profiler.shape(trainingX)):
+        selector = selectFeatures(trainingX,trainingY,k,seed,season,model,n_jobs,sample)
+
+        #adjust the training features
+        trainingX = selector.transform(trainingX)
+        columns = [c for c, chosen in zip(keptColumns,selector.get_support()) if chosen]
+
+    return trainingX, trainingY, columns
+
+def trainModel(season,model,dataset,seed=0,n_jobs=1,evaluation='cv',engine=None,sample=None):
+    """Select features for and fit the given model using the games before the given season.
 
-    #adjust the training features
-    trainingX = selector.transform(trainingX)
+    Parameters:
+        season(Int) - the season to predict.
+        model(String) - the model to be created (Early, Mid, Late).
+        dataset(GameDataset) - the loaded games.
+        seed(Int) - the random state used by feature selection.
+        n_jobs(Int) - the number of cores used to score features and train the model.
+        evaluation(String) - how training probabilities are estimated, 'cv' for 10-fold cross validation, 'foldcv' for
+            10-fold cross validation with feature selection inside every fold, 'oob' for out-of-bag or 'fit' to only
+            fit the classifier, leaving the probabilities as None.
+        engine(String) - the estimator, defaults to the engine of the phase in phaseEngines.
+        sample(Int) - the size of a stratified subsample that feature scores are estimated on, None uses every game.
+
+    Returns:
+        trained(Dict) - the selected columns of the dataset and their names, the engine, the bin edges
+            of the selected features (None unless the engine is 'histgb'), the fitted classifier, its
+            cross validation probabilities, the training outcomes and the training data fingerprint.
+    """
+    if engine is None:
+        engine = phaseEngines[model]
 
     #select parameters selected from runTests based off model
-    if model == 'Early':
-        params = {'random_state': 42, 'n_estimators': 250, 'min_samples_split': 61, 'min_samples_leaf': 11, 'max_features': 48}
-    elif model == 'Mid':
-        params = {'random_state': 42, 'n_estimators': 75, 'min_samples_split': 94, 'min_samples_leaf': 31, 'max_features': 13}
-    elif model == 'Late':
-        params = {'random_state': 42, 'n_estimators': 350, 'min_samples_split': 31, 'min_samples_leaf': 87, 'max_features': 32}
-
-    #create model
-    classifier = ExtraTreesClassifier(**params)
-
-    #get cross validation results
-    cvProbs = cross_val_predict(classifier,trainingX,trainingY,cv=10,method='predict_proba')
-    
-    #create testing data
-    testingFrame = df[df['season'] == season]
+    params = phaseParams[engine][model]
+
+    candidates = candidateFeatures(season,model,dataset)
+    trainingX, trainingY, columns = prepareFeatures(season,model,dataset,seed,n_jobs,candidates,sample)
+
+    #get honest cross validation results by selecting features within every fold
+    foldProbs = None
+    if evaluation == 'foldcv':
+        candidateX, k = candidates[0], candidates[3]
+        key = FeatureStore.fingerprint(candidateX,trainingY,params,k,seed,engine,sample)
+        with Profiler.step('selection cv',shape=Profiler.shape(candidateX),engine=engine):
+            foldProbs = ModelCache.memoize('foldcv',key,lambda: selectionCV(params,candidateX,trainingY,k,seed,n_jobs,engine,10,sample))
+        evaluation = 'fit'
+
+    #bin the selected features once for the histogram engine, every fold reuses the codes
+    edges = None
+    if engine == 'histgb':
+        with Profiler.step('binning',shape=Profiler.shape(trainingX)):
+            edges = FeatureStore.binEdges(trainingX)
+            trainingX = FeatureStore.applyBins(trainingX,edges)
+
+    #create and fit the model, getting cross validation results
+    with Profiler.step('model',shape=Profiler.shape(trainingX),engine=engine):
+        classifier, cvProbs = fitModel(params,trainingX,trainingY,n_jobs,evaluation,engine)
+    if foldProbs is not None:
+        cvProbs = foldProbs
+
+    return {'columns': columns,
+            'features': [dataset.features[c] for c in columns],
+            'engine': engine,
+            'edges': edges,
+            'classifier': classifier,
+            'cvProbs': cvProbs,
+            'trainingY': trainingY,
+            'fingerprint': FeatureStore.fingerprint(trainingX,trainingY)}
+
+def chooseModel(season,model,dataset=None,seed=0,n_jobs=1,evaluation='cv',engine=None,sample=None):
+    """Create the given model and predict the given season
+
+    Parameters:
+        season(Int) - the season to predict.
+        model(String) - the model to be created (Early, Mid, Late).
+        dataset(GameDataset) - the loaded games, read from the feature store when not given.
+        seed(Int) - the random state used by feature selection.
+        n_jobs(Int) - the number of cores used to score features and train the model.
+        evaluation(String) - how training probabilities are estimated, 'cv' for 10-fold cross validation, 'foldcv' for
+            10-fold cross validation with feature selection inside every fold or 'oob' for out-of-bag.
+        engine(String) - the estimator, defaults to the engine of the phase in phaseEngines.
+        sample(Int) - the size of a stratified subsample that feature scores are estimated on, None uses every game.
 
+    Returns:
+        proba(List) - a list of probabilities from the model.
+        preds(List) - a list of outcomes predicted by the model.
+        testingY(List) - a list that contains the actual outcome from the model
+    """
     #select games based off model
-    if model == 'Early':
-        testingFrame = UseOnlyEarlyGames(testingFrame)
-    elif model == 'Mid':
-        testingFrame = UseOnlyMidGames(testingFrame)
-    elif model == 'Late':
-        testingFrame = UseOnlyLateGames(testingFrame)
-    
-    #drop unneeded columns and replace NaNs/Inf
-    testingFrame = testingFrame.drop(['Game_Id','RegOrOT','Away_Team','Home_Team','season','isPlayoff'], axis=1) 
-    testingFrame.replace([np.inf, -np.inf], np.nan, inplace=True)
-    testingFrame = testingFrame.fillna(0)
+    if model not in ['Early','Mid','Late']:
+        print("Error: use either 'Early', 'Mid', or 'Late' for model parameter.")
+        return
 
-    #separate x and y for the training set
-    testingX = testingFrame[testingFrame.columns.difference(['Outcome'])]
-    testingY = testingFrame['Outcome'].astype('int32')
+    with Profiler.step('chooseModel',season=season,phase=model,seed=seed):
+        #read in the seasons up to the one being predicted
+        if dataset is None:
+            with Profiler.step('load store'):
+                dataset = FeatureStore.GameDataset(seasons=('<=',season))
 
-    #adjust testing features
-    testingX = selector.transform(testingX)
+        trained = trainModel(season,model,dataset,seed,n_jobs,evaluation,engine,sample)
+        classifier = trained['classifier']
 
-    #fit model
-    classifier.fit(trainingX,trainingY)
+        #create testing data
+        testingX, testingY = dataset.split(season,model,'test')
 
-    #score model
-    proba = classifier.predict_proba(testingX)
-    preds = classifier.predict(testingX)
+        #adjust testing features
+        testingX = testingX[:,trained['columns']]
+        if trained['edges'] is not None:
+            testingX = FeatureStore.applyBins(testingX,trained['edges'])
+
+        #score model
+        with Profiler.step('predict',shape=Profiler.shape(testingX)):
+            proba = classifier.predict_proba(testingX)
+            preds = classifier.predict(testingX)
 
-    return list(proba), list(preds), list(testingY), list(cvProbs[:, 1]), list(trainingY)
+    return list(proba), list(preds), list(testingY), list(trained['cvProbs'][:, 1]), list(trained['trainingY'])
 
-def runTests(season,state):
+def exportBundles(season,version=None,dataset=None,seed=0,n_jobs=1):
+    """Train the Early, Mid and Late models on every game before a season and save them as bundles.
+
+    Parameters:
+        season(Int) - the season the models will predict.
+        version(String) - the name of the bundle version, defaults to the season and the current time.
+        dataset(GameDataset) - the loaded games, read from the feature store when not given.
+        seed(Int) - the random state used by feature selection.
+        n_jobs(Int) - the number of cores used to train each model.
+
+    Returns:
+        version(String) - the name of the saved bundle version.
+    """
+    if dataset is None:
+        dataset = FeatureStore.GameDataset(seasons=('<',season))
+
+    if version is None:
+        version = ModelBundle.newVersion(season)
+
+    bundles = {}
+    for model in ['Early','Mid','Late']:
+        #exported models are only fit, their cross validation results would not be used
+        trained = trainModel(season,model,dataset,seed,n_jobs,'fit')
+
+        #mark the selected features among every feature in the store
+        mask = np.zeros(len(dataset.features),dtype=bool)
+        mask[trained['columns']] = True
+
+        bundles[model] = {
+            'season': season,
+            'phase': model,
+            'featureNames': dataset.features,
+            'mask': mask,
+            'features': trained['features'],
+            'engine': trained['engine'],
+            'edges': trained['edges'],
+            'classifier': trained['classifier'],
+            'fingerprint': trained['fingerprint']
+        }
+        ModelBundle.saveBundle(version,model,bundles[model])
+
+    #list the stats, windows and cross modes the selected features need, for feature builds that only create those
+    ModelBundle.writeFeatureManifest(version,ModelBundle.requiredFeatures(bundles))
+    ModelBundle.writeManifest(version,season,['Early','Mid','Late'])
+
+    return version
+
+def runTests(season,state,dataset=None,search='random',n_jobs=1,profile=None,engine=None):
     """Run hyperparameter tuning and select features.
 
     Parameters:
         season(Int) - the season to predict.
         model(String) - the model to be created (Early, Mid, Late).
+        dataset(GameDataset) - the loaded games, read from the feature store when not given.
+        search(String) - the hyperparameter search, either 'random' or 'halving'.
+        n_jobs(Int) - the number of cores used by the search and cross validation.
+        profile(String) - where to write a json report of the time, memory, fits and cache hits of each step, None to skip profiling.
+        engine(String) - the estimator to tune, defaults to the engine of the phase in phaseEngines.
     """
-    #read in the data
-    df = pd.read_csv("Dataframes/CombinedFrame.csv")
-
-    #create training data
-    trainingFrame = df[(df['season'] < season)]
-
     #determine which games to use given the model string
     print(state)
-    if state == 'Early':
-        trainingFrame = UseOnlyEarlyGames(trainingFrame)
-    elif state == 'Mid':
-        trainingFrame = UseOnlyMidGames(trainingFrame)
-    elif state == 'Late':
-        trainingFrame = UseOnlyLateGames(trainingFrame)
-    else:
+    if state not in ['Early','Mid','Late']:
         print("Error: use either 'Early', 'Mid', or 'Late' for model parameter.")
         return
 
-    #remove OT games, drop unneeded columns, and replace NaNs/Inf
-    trainingFrame = trainingFrame[trainingFrame['RegOrOT'] != 'OT']
-    trainingFrame = trainingFrame.drop(['Game_Id','RegOrOT','Away_Team','Home_Team','season','isPlayoff'], axis=1) 
-    trainingFrame.replace([np.inf, -np.inf], np.nan, inplace=True)
-    trainingFrame = trainingFrame.fillna(0)
+    if profile is not None:
+        Profiler.enable()
 
-    #separate x and y for the training set
-    trainingX = trainingFrame[trainingFrame.columns.difference(['Outcome'])]
-    trainingY = trainingFrame['Outcome'].astype('int32')
+    #read in the seasons up to the one being predicted
+    if dataset is None:
+        with Profiler.step('load store'):
+            dataset = FeatureStore.GameDataset(seasons=('<=',season))
 
     #create the model
-    classifier = ExtraTreesClassifier(random_state=42)
-    
-    #perform feature selection
-    selector = SelectPercentile(score_func=mutual_info_classif,percentile=10).fit(trainingX,trainingY)
-    
-    #adjust the training features
-    trainingX = selector.transform(trainingX)
-
-    #tune parameters
-    params = parameterTuning(classifier,trainingX,trainingY)
+    if engine is None:
+        engine = phaseEngines[state]
+    classifier = makeClassifier(engine,{'random_state': 42})
+
+    #select features the same way the models are trained
+    trainingX, trainingY, columns = prepareFeatures(season,state,dataset,0,n_jobs)
+
+    #bin the features once for the histogram engine, every trial and fold reuses the codes
+    edges = None
+    if engine == 'histgb':
+        with Profiler.step('binning',shape=Profiler.shape(trainingX)):
+            edges = FeatureStore.binEdges(trainingX)
+            trainingX = FeatureStore.applyBins(trainingX,edges)
+
+    #tune parameters, keeping a separate trial log for each engine
+    with Profiler.step('tuning',search=search,engine=engine):
+        params = parameterTuning(classifier,trainingX,trainingY,search,n_jobs,state if engine == 'extratrees' else state + '-' + engine)
     print(params)
 
     #set classifier parameters
-    classifier = ExtraTreesClassifier(**params)
+    classifier = makeClassifier(engine,params)
 
     print(state + " Cross Validation Scores:")
 
-    #iterate through the scoring metrics
+    #fit each fold once and compute every scoring metric from it, folds run in parallel
     scoring = ['accuracy','neg_log_loss','roc_auc','f1']
+    with Profiler.step('cross validation',shape=Profiler.shape(trainingX)):
+        cv = cross_validate(classifier,trainingX,trainingY,cv=10,scoring=scoring,n_jobs=n_jobs)
+    Profiler.count('fits',10)
+    if 'n_estimators' in params:
+        Profiler.count('trees',params['n_estimators'] * 10)
     for i in scoring:
-        cv = cross_val_score(classifier,trainingX,trainingY,cv=10,scoring=i)
-        print(i + ": " + str(cv.mean()))
+        print(i + ": " + str(cv['test_' + i].mean()))
+
+    #report the time taken by each fold
+    for i in range(len(cv['fit_time'])):
+        print("Fold " + str(i + 1) + " fit: " + str(round(cv['fit_time'][i],3)) + "s score: " + str(round(cv['score_time'][i],3)) + "s")
 
     print("")
 
     #create testing data
-    testingFrame = df[df['season'] == season]
-
-    #determine which games to use given the model string
-    if state == 'Early':
-        testingFrame = UseOnlyEarlyGames(testingFrame)
-    elif state == 'Mid':
-        testingFrame = UseOnlyMidGames(testingFrame)
-    elif state == 'Late':
-        testingFrame = UseOnlyLateGames(testingFrame)
-
-    #drop unneeded columns and replace NaNs/Inf
-    testingFrame = testingFrame.drop(['Game_Id','RegOrOT','Away_Team','Home_Team','season','isPlayoff'], axis=1) 
-    testingFrame.replace([np.inf, -np.inf], np.nan, inplace=True)
-    testingFrame = testingFrame.fillna(0)
-
-    #separate x and y for the training set
-    testingX = testingFrame[testingFrame.columns.difference(['Outcome'])]
-    testingY = testingFrame['Outcome'].astype('int32')
+    testingX, testingY = dataset.split(season,state,'test')
 
     #adjust testing features
-    testingX = selector.transform(testingX)
+    testingX = testingX[:,columns]
+    if edges is not None:
+        testingX = FeatureStore.applyBins(testingX,edges)
 
     #fit model
-    classifier.fit(trainingX,trainingY)
+    with Profiler.step('final fit',shape=Profiler.shape(trainingX)):
+        classifier.fit(trainingX,trainingY)
+    Profiler.count('fits')
+    Profiler.count('trees',treesBuilt(classifier))
 
     #score model
-    proba = classifier.predict_proba(testingX)
-    preds = classifier.predict(testingX)
+    with Profiler.step('predict',shape=Profiler.shape(testingX)):
+        proba = classifier.predict_proba(testingX)
+        preds = classifier.predict(testingX)
 
     print("Testing " + state + " " + str(season) + " season")
     print("Accuracy: " + str(accuracy_score(testingY,preds)))
@@ -348,52 +887,235 @@ def runTests(season,state):
     print("F1-Score: " + str(f1_score(testingY,preds)))
     print("")
 
-def main(season):
+    if profile is not None:
+        Profiler.write(profile)
+        Profiler.disable()
+        print("Profile written to " + profile)
+
+def scorePhases(results):
+    """Join the results of several models, in the order given, and score them.
+
+    Parameters:
+        results(List) - the results of chooseModel, usually for the Early, Mid and Late models.
+
+    Returns:
+        cvScores(List) - the cross validation accuracy, log loss, AUC and F1-score.
+        testScores(List) - the testing accuracy, log loss, AUC and F1-score.
+    """
+    #join probabilites, predictions, and outcomes together
+    totalProba, totalPreds, totalOutcomes, cvProba, cvOutcomes = [], [], [], [], []
+    for proba, preds, outcomes, modelCVProba, modelCVOutcomes in results:
+        totalProba += proba
+        totalPreds += preds
+        totalOutcomes += outcomes
+        cvProba += modelCVProba
+        cvOutcomes += modelCVOutcomes
+    cvPreds = [np.round(x) for x in cvProba]
+
+    cvScores = [accuracy_score(cvOutcomes,cvPreds),log_loss(cvOutcomes,cvProba),
+                roc_auc_score(cvOutcomes,cvPreds),f1_score(cvOutcomes,cvPreds)]
+    testScores = [accuracy_score(totalOutcomes,totalPreds),log_loss(totalOutcomes,totalProba),
+                  roc_auc_score(totalOutcomes,totalPreds),f1_score(totalOutcomes,totalPreds)]
+
+    return cvScores, testScores
+
+def compareEngines(season,dataset=None,engines=['extratrees','histgb'],seed=0,n_jobs=1):
+    """Train every engine on the same games and selected features of each phase and compare them.
+
+    Models are trained without the model cache so the times are real. The time of the histogram
+    engine includes binning its features.
+
+    Parameters:
+        season(Int) - the season to predict.
+        dataset(GameDataset) - the loaded games, read from the feature store when not given.
+        engines(List) - the engines to compare, see makeClassifier.
+        seed(Int) - the random state used by feature selection.
+        n_jobs(Int) - the number of cores used to train each model.
+
+    Returns:
+        results(Dict) - the training seconds, trees, cross validation log loss, testing log loss and
+            testing accuracy keyed by (phase, engine).
+    """
+    if dataset is None:
+        dataset = FeatureStore.GameDataset(seasons=('<=',season))
+
+    results = {}
+    print("Phase  Engine      Seconds  Trees  CV LL   Test LL  Test Acc")
+    for model in ['Early','Mid','Late']:
+        trainingX, trainingY, columns = prepareFeatures(season,model,dataset,seed,n_jobs)
+        testingX, testingY = dataset.split(season,model,'test')
+        testingX = testingX[:,columns]
+
+        for engine in engines:
+            start = time.perf_counter()
+            X, testX = trainingX, testingX
+            if engine == 'histgb':
+                edges = FeatureStore.binEdges(trainingX)
+                X, testX = FeatureStore.applyBins(trainingX,edges), FeatureStore.applyBins(testingX,edges)
+            classifier, cvProbs = trainClassifier(phaseParams[engine][model],X,trainingY,n_jobs,'cv',engine)
+            seconds = time.perf_counter() - start
+
+            proba = classifier.predict_proba(testX)
+            results[(model,engine)] = {'seconds': seconds,
+                                       'trees': treesBuilt(classifier),
+                                       'cvLogLoss': log_loss(trainingY,cvProbs),
+                                       'testLogLoss': log_loss(testingY,proba),
+                                       'testAccuracy': accuracy_score(testingY,classifier.predict(testX))}
+
+            r = results[(model,engine)]
+            print(model.ljust(7) + engine.ljust(12) + str(round(seconds,2)).ljust(9) + str(r['trees']).ljust(7) +
+                  str(round(r['cvLogLoss'],4)).ljust(8) + str(round(r['testLogLoss'],4)).ljust(9) + str(round(r['testAccuracy'],4)))
+
+    return results
+
+def timeModel(season,model,dataset,seed=0,n_jobs=1,evaluation='cv'):
+    """Run chooseModel and time it.
+
+    Parameters:
+        season(Int) - the season to predict.
+        model(String) - the model to be created (Early, Mid, Late).
+        dataset(GameDataset) - the loaded games.
+        seed(Int) - the random state used by feature selection.
+        n_jobs(Int) - the number of cores used to score features and train the model.
+        evaluation(String) - how training probabilities are estimated, see chooseModel.
+
+    Returns:
+        result(Tuple) - the result of chooseModel.
+        seconds(Float) - the seconds it took.
+    """
+    start = time.perf_counter()
+    result = chooseModel(season,model,dataset,seed,n_jobs,evaluation)
+
+    return result, time.perf_counter() - start
+
+def sweepPhases(season,boundaries,dataset=None,seed=0,n_jobs=1,evaluation='cv'):
+    """Train and score the Early, Mid and Late models for several choices of phase boundaries.
+
+    The games are loaded once and every configuration relabels them from the team game index of
+    the dataset, sharing its feature matrix. Every phase of every configuration is trained in
+    parallel, and models, selected features and redundancy decisions are cached by their training
+    data, so the configuration in FeatureStore.phaseGames and any repeated configuration reuse
+    earlier work. The seconds of a configuration are the time its three models took to train and
+    predict, summed over the phases.
+
+    Parameters:
+        season(Int) - the season to predict.
+        boundaries(List of Tuples) - the (early, mid) number of games of each configuration.
+        dataset(GameDataset) - the loaded games, read from the feature store when not given.
+        seed(Int) - the random state used by feature selection.
+        n_jobs(Int) - the total number of cores, -1 for every core.
+        evaluation(String) - how training probabilities are estimated, see chooseModel.
+
+    Returns:
+        results(Dict) - the training games of each phase, the seconds taken and the cross validation
+            and testing scores keyed by (early, mid).
+    """
+    if dataset is None:
+        dataset = FeatureStore.GameDataset(seasons=('<=',season))
+
+    #every phase of a configuration needs games to train on and to predict
+    configs = {}
+    for early, mid in boundaries:
+        relabelled = dataset.withPhases(early,mid)
+
+        #count the games of each phase from the labels, splitting would copy the features
+        training = (relabelled.season < season) & ~relabelled.isOT
+        trained = np.bincount(relabelled.phase[training],minlength=len(dataset.phases))
+        tested = np.bincount(relabelled.phase[relabelled.season == season],minlength=len(dataset.phases))
+        games = {model: int(n) for model, n in zip(dataset.phases,trained)}
+        if trained.min() == 0 or tested.min() == 0:
+            print("Skipping early=" + str(early) + ", mid=" + str(mid) + ", a phase has no games")
+            continue
+        configs[(early,mid)] = (relabelled,games)
+
+    #every phase of every configuration is an independent job
+    jobs = [(config,model) for config in configs for model in dataset.phases]
+    processes, perJob = splitCores(n_jobs,len(jobs))
+    timed = Parallel(n_jobs=processes)(delayed(timeModel)(season,model,configs[config][0],seed,perJob,evaluation) for config, model in jobs)
+
+    results = {}
+    print("Early  Mid  Train Games (E/M/L)  Seconds  CV Acc  CV LL   Test Acc  Test LL  Test AUC")
+    for i, config in enumerate(configs):
+        phases = timed[i * 3:i * 3 + 3]
+        cv, test = scorePhases([result for result, seconds in phases])
+        games = configs[config][1]
+        results[config] = {'trainingGames': games,
+                           'seconds': sum(seconds for result, seconds in phases),
+                           'cv': cv,
+                           'test': test}
+
+        print(str(config[0]).ljust(7) + str(config[1]).ljust(5) + "/".join(str(games[m]) for m in dataset.phases).ljust(21) +
+              str(round(results[config]['seconds'],2)).ljust(9) + str(round(cv[0],4)).ljust(8) + str(round(cv[1],4)).ljust(8) +
+              str(round(test[0],4)).ljust(10) + str(round(test[1],4)).ljust(9) + str(round(test[2],4)))
+
+    return results
+
+def runModels(calls,n_jobs=1):
+    """Run chooseModel once for each set of arguments in separate processes.
+
+    When profiling, each process profiles its own models and the reports are added to this one.
+
+    Parameters:
+        calls(List of Tuples) - the arguments of each chooseModel call.
+        n_jobs(Int) - the number of processes.
+
+    Returns:
+        results(List) - the result of each call, in order.
+    """
+    if not Profiler.enabled:
+        return Parallel(n_jobs=n_jobs)(delayed(chooseModel)(*args) for args in calls)
+
+    collected = Parallel(n_jobs=n_jobs)(delayed(Profiler.collect)(chooseModel,*args) for args in calls)
+    for result, summary in collected:
+        Profiler.merge(summary)
+
+    return [result for result, summary in collected]
+
+def main(season,seeds=range(10),n_jobs=1,evaluation='cv',profile=None,sample=None):
     """Create all three models and output performance.
 
+    Feature selection is the only random step, so each run uses its own selection seed and
+    results are averaged over the seeds. Fitted selectors and models are cached, so repeating
+    a run only scores the cached models.
+
     Parameters:
         season(Int) - the season to predict.
+        seeds(List of Ints) - the feature selection seeds to average over.
+        n_jobs(Int) - the total number of cores, -1 for every core. The Early, Mid and Late
+            models of every seed are trained in separate processes and any cores left over are
+            shared between feature scoring, folds and trees within each model.
+        evaluation(String) - 'cv' to report 10-fold cross validation results, 'foldcv' to report 10-fold
+            cross validation results with features selected inside every fold or 'oob' to report
+            out-of-bag results from a single bootstrapped forest per model.
+        profile(String) - where to write a json report of the time, memory, fits and cache hits of each step, None to skip profiling.
+        sample(Int) - the size of a stratified subsample that feature scores are estimated on, None uses every game.
     """
+    if profile is not None:
+        Profiler.enable()
 
-    #where cross validation results are stored
-    cvAcc =[]
-    cvLL = []
-    cvAUC = []
-    cvF1 = []
-
-    #where test results are stored
-    testAcc =[]
-    testLL = []
-    testAUC = []
-    testF1 = []
-
-    for i in range(10):
-        #create the three models
-        earlyProba, earlyPreds, earlyOutcomes, earlyCVProba, earlyCVOutcomes = chooseModel(season,'Early')
-        midProba, midPreds, midOutcomes, midCVProba, midCVOutcomes  = chooseModel(season,'Mid')
-        lateProba, latePreds, lateOutcomes, lateCVProba, lateCVOutcomes  = chooseModel(season,'Late')
-
-        #join probabilites, predictions, and outcomes together
-        cvProba = earlyCVProba + midCVProba + lateCVProba
-        cvPreds = [np.round(x) for x in cvProba]
-        cvOutcomes = earlyCVOutcomes + midCVOutcomes + lateCVOutcomes
-        totalProba = earlyProba + midProba + lateProba
-        totalPreds = earlyPreds + midPreds + latePreds
-        totalOutcomes = earlyOutcomes + midOutcomes + lateOutcomes
-
-        #add estimations to lists
-        cvAcc.append(accuracy_score(cvOutcomes,cvPreds))
-        cvLL.append(log_loss(cvOutcomes,cvProba))
-        cvAUC.append(roc_auc_score(cvOutcomes,cvPreds))
-        cvF1.append(f1_score(cvOutcomes,cvPreds))
-
-        testAcc.append(accuracy_score(totalOutcomes,totalPreds))
-        testLL.append(log_loss(totalOutcomes,totalProba))
-        testAUC.append(roc_auc_score(totalOutcomes,totalPreds))
-        testF1.append(f1_score(totalOutcomes,totalPreds))
+    #load and clean the games once for every model
+    with Profiler.step('load store'):
+        dataset = FeatureStore.GameDataset(seasons=('<=',season))
+
+    #every phase of every seed is an independent job
+    jobs = [(seed,model) for seed in seeds for model in ['Early','Mid','Late']]
+    processes, perJob = splitCores(n_jobs,len(jobs))
+    results = runModels([(season,model,dataset,seed,perJob,evaluation,None,sample) for seed, model in jobs],processes)
+
+    #results come back in job order, so each seed's models are joined as early+mid+late
+    results = [scorePhases(results[i:i + 3]) for i in range(0,len(results),3)]
+
+    #where cross validation and test results are stored
+    cvAcc, cvLL, cvAUC, cvF1 = zip(*[r[0] for r in results])
+    testAcc, testLL, testAUC, testF1 = zip(*[r[1] for r in results])
 
     #output metrics
-    print("Cross Validation Results")
+    if evaluation == 'oob':
+        print("Out-of-Bag Results")
+    elif evaluation == 'foldcv':
+        print("Cross Validation Results (selection within folds)")
+    else:
+        print("Cross Validation Results")
     print("Accuracy: " + str(sum(cvAcc)/len(cvAcc)))
     print("Log Loss: " + str(sum(cvLL)/len(cvLL)))
     print("AUC: " + str(sum(cvAUC)/len(cvAUC)))
@@ -405,10 +1127,74 @@ def main(season):
     print("AUC: " + str(sum(testAUC)/len(testAUC)))
     print("F1-Score: " + str(sum(testF1)/len(testF1)))
 
-#these methods select hyperparameters 
-#runTests(2021,'Early')
-#runTests(2021,'Mid')
-#runTests(2021,'Late')
-    
-#predict outcomes
-main(2021)
+    if profile is not None:
+        Profiler.write(profile)
+        Profiler.disable()
+        print("Profile written to " + profile)
+
+def backtest(seasons=range(2012,2022),seed=0,n_jobs=1,evaluation='cv',profile=None,sample=None):
+    """Walk forward through the given seasons, predicting each with the games before it.
+
+    The store is read and cleaned once for every season, and the Early, Mid and Late models of
+    every season are trained in separate processes. Redundancy checks, feature scores and models are
+    cached by the contents of their training data, so repeating a backtest only scores the cached models.
+
+    Parameters:
+        seasons(List of Ints) - the seasons to predict.
+        seed(Int) - the random state used by feature selection.
+        n_jobs(Int) - the total number of cores, -1 for every core.
+        evaluation(String) - 'cv' to report 10-fold cross validation results, 'foldcv' to report 10-fold
+            cross validation results with features selected inside every fold or 'oob' to report
+            out-of-bag results from a single bootstrapped forest per model.
+        profile(String) - where to write a json report of the time, memory, fits and cache hits of each step, None to skip profiling.
+            Every chooseModel step is labelled with its season, so training cost can be tracked per season.
+        sample(Int) - the size of a stratified subsample that feature scores are estimated on, None uses every game.
+
+    Returns:
+        scores(Dict) - the cross validation and testing scores of each season, and of every season pooled under 'Pooled'.
+    """
+    seasons = list(seasons)
+
+    if profile is not None:
+        Profiler.enable()
+
+    #load and clean the games once for every season
+    with Profiler.step('load store'):
+        dataset = FeatureStore.GameDataset(seasons=('<=',max(seasons)))
+
+    #every phase of every season is an independent job
+    jobs = [(season,model) for season in seasons for model in ['Early','Mid','Late']]
+    processes, perJob = splitCores(n_jobs,len(jobs))
+    results = runModels([(season,model,dataset,seed,perJob,evaluation,None,sample) for season, model in jobs],processes)
+
+    #score each season on its own, then every prediction of the backtest together
+    scores = {season: scorePhases(results[i * 3:i * 3 + 3]) for i, season in enumerate(seasons)}
+    scores['Pooled'] = scorePhases(results)
+
+    #output metrics, one row per season
+    print("Season  CV Acc  CV LL   Test Acc  Test LL  Test AUC  Test F1")
+    for season, (cv, test) in scores.items():
+        print(str(season).ljust(8) + str(round(cv[0],4)).ljust(8) + str(round(cv[1],4)).ljust(8) +
+              str(round(test[0],4)).ljust(10) + str(round(test[1],4)).ljust(9) + str(round(test[2],4)).ljust(10) + str(round(test[3],4)))
+
+    if profile is not None:
+        Profiler.write(profile)
+        Profiler.disable()
+        print("Profile written to " + profile)
+
+    return scores
+
+if __name__ == '__main__':
+    #these methods select hyperparameters 
+    #runTests(2021,'Early')
+    #runTests(2021,'Mid')
+    #runTests(2021,'Late')
+
+    #predict outcomes
+    main(2021)
+
+    #validate against every season from 2012 to 2021
+    #backtest(range(2012,2022))
+
+    #compare other boundaries between the Early, Mid and Late models
+    #sweepPhases(2021,[(early,mid) for early in [10,15,20,25,30] for mid in [32,37,42,47,52]])
@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+#where the fingerprint of each finished stage is kept, see FeatureStore.cacheDir
+statePath = "Cache/pipeline.json"
+
+#the game windows created for the combined frame
+windows = [5,10,20,40,82]
+
+def windowFiles():
+    """Get the csv of every game window and cross mode.
+
+    Returns:
+        files(List) - the locations of the game window csvs.
+    """
+    return ["DataFrames/" + str(i) + end + ".csv" for end in ['NoCross','Cross'] for i in windows]
+
+def runDatabase(options):
+    """Summarize the play-by-play data into the game database."""
+    import DatabaseCreationNHL
+    DatabaseCreationNHL.main()
+
+def runWindows(options):
+    """Create the game window csvs from the game database."""
+    import GameIntervalCreation
+    GameIntervalCreation.runParallel(windows,workers=options.workers)
+
+def runCombined(options):
+    """Join the game window csvs into the feature store."""
+    import makeCombinedDataset
+    makeCombinedDataset.main()
+
+def runModels(options):
+    """Train and export the Early, Mid and Late models."""
+    import ModelCreation
+    version = ModelCreation.exportBundles(options.season,n_jobs=options.jobs)
+    print("Exported models " + version)
+
+#each stage lists the code it runs, the files it reads and the files it writes, in dependency order
+stages = [
+    {'name': 'database',
+     'code': ['DatabaseCreationNHL.py'],
+     'inputs': ['Raw Data'],
+     'outputs': ['Database/NHLData.csv'],
+     'run': runDatabase},
+    {'name': 'windows',
+     'code': ['GameIntervalCreation.py'],
+     'inputs': ['Database/NHLData.csv'],
+     'outputs': windowFiles(),
+     'run': runWindows},
+    {'name': 'combined',
+     'code': ['makeCombinedDataset.py','FeatureStore.py'],
+     'inputs': windowFiles(),
+     'outputs': ['DataFrames/CombinedFrame.parquet','DataFrames/CombinedFrame.json'],
+     'run': runCombined},
+    {'name': 'models',
+     'code': ['ModelCreation.py','FeatureStore.py','ModelCache.py','ModelBundle.py','TreeEnsemble.py','Profiler.py'],
+     'inputs': ['DataFrames/CombinedFrame.parquet','DataFrames/CombinedFrame.json'],
+     'outputs': ['Models/LATEST'],
+     'run': runModels}
+]
+
+#the options that change what a stage produces
+stageOptions = {'models': ['season']}
+
+def listFiles(path):
+    """Get every file at a path, walking into folders.
+
+    Parameters:
+        path(String) - a file or folder.
+
+    Returns:
+        files(List) - the files in sorted order.
+    """
+    if not os.path.isdir(path):
+        return [path]
+
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        files.extend(os.path.join(root,name) for name in sorted(names))
+
+    return files
+
+def fileDigest(path,known):
+    """Hash the contents of a file, reusing the previous hash if its size and modification time are unchanged.
+
+    Parameters:
+        path(String) - the file to hash.
+        known(Dict) - the size, modification time and hash of previously hashed files, updated in place.
+
+    Returns:
+        digest(String) - the hash of the file, or 'missing' when it does not exist.
+    """
+    if not os.path.exists(path):
+        return 'missing'
+
+    stat = os.stat(path)
+    if path in known and known[path][:2] == [stat.st_size,stat.st_mtime_ns]:
+        return known[path][2]
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path,'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20),b''):
+            h.update(chunk)
+
+    known[path] = [stat.st_size,stat.st_mtime_ns,h.hexdigest()]
+
+    return known[path][2]
+
+def stageKey(stage,options,known):
+    """Fingerprint the code, inputs and options of a stage.
+
+    Parameters:
+        stage(Dict) - the stage.
+        options(Namespace) - the command line options.
+        known(Dict) - previously hashed files, see fileDigest.
+
+    Returns:
+        key(String) - the fingerprint of the stage.
+    """
+    h = hashlib.blake2b(digest_size=16)
+
+    for path in stage['code'] + stage['inputs']:
+        for file in listFiles(path):
+            h.update((file + fileDigest(file,known)).encode())
+
+    settings = {name: getattr(options,name) for name in stageOptions.get(stage['name'],[])}
+    h.update(json.dumps(settings,sort_keys=True).encode())
+
+    return h.hexdigest()
+
+def readState():
+    """Read the fingerprints of the finished stages and hashed files.
+
+    Returns:
+        state(Dict) - the key of each finished stage under 'stages' and the known files under 'files'.
+    """
+    if not os.path.exists(statePath):
+        return {'stages': {}, 'files': {}}
+
+    with open(statePath) as f:
+        return json.load(f)
+
+def writeState(state):
+    """Save the fingerprints of the finished stages and hashed files.
+
+    Parameters:
+        state(Dict) - see readState.
+    """
+    os.makedirs(os.path.dirname(statePath),exist_ok=True)
+    with open(statePath,'w') as f:
+        json.dump(state,f,indent=1)
+
+def run(options):
+    """Run every stage in order, skipping stages whose code, inputs and options are unchanged.
+
+    Parameters:
+        options(Namespace) - the command line options.
+
+    Returns:
+        ran(List) - the names of the stages that were run, or would be run on a dry run.
+    """
+    state = readState()
+    names = [stage['name'] for stage in stages]
+    first = names.index(options.start)
+    last = names.index(options.stop)
+    ran = []
+
+    for stage in stages[first:last + 1]:
+        key = stageKey(stage,options,state['files'])
+        finished = all(os.path.exists(path) for path in stage['outputs'])
+
+        #on a dry run the inputs of a stage after one that would run are assumed to change
+        upToDate = state['stages'].get(stage['name']) == key and finished and not (options.dry_run and ran)
+
+        if upToDate and stage['name'] not in options.force:
+            print("Skipping " + stage['name'] + ", nothing has changed")
+            continue
+
+        ran.append(stage['name'])
+        if options.dry_run:
+            print("Would run " + stage['name'])
+            continue
+
+        print("Running " + stage['name'])
+        start = time.perf_counter()
+        stage['run'](options)
+        print("Finished " + stage['name'] + " in " + str(round(time.perf_counter() - start,1)) + "s")
+
+        #record the stage, and the hashes of its outputs for the next stage
+        state['stages'][stage['name']] = key
+        for path in stage['outputs']:
+            for file in listFiles(path):
+                fileDigest(file,state['files'])
+        writeState(state)
+
+    return ran
+
+def main(argv=None):
+    """Run the pipeline from the command line."""
+    names = [stage['name'] for stage in stages]
+    parser = argparse.ArgumentParser(description="Build the game database, features and models, skipping stages that are up to date.")
+    parser.add_argument("--start",choices=names,default=names[0],help="the first stage to consider")
+    parser.add_argument("--stop",choices=names,default=names[-1],help="the last stage to consider")
+    parser.add_argument("--force",nargs='*',choices=names,default=[],help="stages to run even if nothing has changed")
+    parser.add_argument("--season",type=int,default=2021,help="the season the exported models predict")
+    parser.add_argument("--jobs",type=int,default=1,help="the number of cores used to train each model")
+    parser.add_argument("--workers",type=int,help="the number of processes creating game windows")
+    parser.add_argument("--dry-run",action='store_true',help="list the stages that would run without running them")
+    options = parser.parse_args(argv)
+
+    run(options)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import json
+import resource
+import time
+from contextlib import contextmanager
+
+#profiling is opt-in, every function below does nothing until enable is called
+enabled = False
+
+#the finished steps, the steps currently running and the counts over the whole run
+steps = []
+running = []
+totals = {}
+
+def enable():
+    """Start recording steps, clearing anything recorded before."""
+    global enabled
+    enabled = True
+    steps.clear()
+    running.clear()
+    totals.clear()
+
+def disable():
+    """Stop recording steps."""
+    global enabled
+    enabled = False
+
+def maxRSS():
+    """Get the peak resident memory of this process so far.
+
+    Returns:
+        peak(Float) - the peak memory in MB.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+@contextmanager
+def step(name,**info):
+    """Record the wall time, peak memory and counts of a block of code.
+
+    Steps can be nested, each one is named by the steps it runs within. Memory is read from the
+    process's peak resident size, which costs nothing to track, so a step records the peak at its
+    end and how much the step raised it.
+
+    Parameters:
+        name(String) - the name of the step.
+        info - anything else to record with the step, such as matrix shapes.
+    """
+    if not enabled:
+        yield
+        return
+
+    record = {'name': running[-1]['name'] + '/' + name if running else name,
+              'start': time.perf_counter(),
+              'memory': maxRSS(),
+              'counts': {}}
+    record.update(info)
+    running.append(record)
+
+    try:
+        yield
+    finally:
+        running.pop()
+        peak = maxRSS()
+        record['seconds'] = round(time.perf_counter() - record.pop('start'),4)
+        record['peakMB'] = round(peak,1)
+        record['peakIncreaseMB'] = round(peak - record.pop('memory'),1)
+        steps.append(record)
+
+def count(name,amount=1):
+    """Add to a count, such as model fits or cache hits, for the run and every running step.
+
+    Parameters:
+        name(String) - the name of the count.
+        amount(Int) - the amount to add.
+    """
+    if not enabled:
+        return
+
+    totals[name] = totals.get(name,0) + amount
+    for record in running:
+        record['counts'][name] = record['counts'].get(name,0) + amount
+
+def shape(array):
+    """Get the shape of an array as a list for the report.
+
+    Parameters:
+        array(Array) - the array.
+
+    Returns:
+        shape(List) - the size of each dimension.
+    """
+    return [int(n) for n in array.shape]
+
+def report():
+    """Summarize everything recorded so far.
+
+    Returns:
+        summary(Dict) - the finished steps in the order they finished, the counts of the run and the
+            peak resident memory of the process.
+    """
+    return {'steps': list(steps),
+            'counts': dict(totals),
+            'maxRSSMB': round(maxRSS(),1)}
+
+def collect(function,*args):
+    """Run a function with profiling enabled, for use in a worker process.
+
+    Parameters:
+        function(Function) - the function to run.
+        args - the arguments of the function.
+
+    Returns:
+        result - the result of the function.
+        summary(Dict) - the report of the run.
+    """
+    #the function runs in this process, so its steps are already being recorded
+    if enabled:
+        return function(*args), {'steps': [], 'counts': {}}
+
+    enable()
+    try:
+        result = function(*args)
+        return result, report()
+    finally:
+        disable()
+
+def merge(summary):
+    """Add the report of a worker process to this one.
+
+    Parameters:
+        summary(Dict) - a report created by collect.
+    """
+    steps.extend(summary['steps'])
+    for name, amount in summary['counts'].items():
+        totals[name] = totals.get(name,0) + amount
+
+def write(path,summary=None):
+    """Write a report as json.
+
+    Parameters:
+        path(String) - where the report is written.
+        summary(Dict) - the report, defaults to everything recorded so far.
+    """
+    with open(path,'w') as f:
+        json.dump(report() if summary is None else summary,f,indent=1)
@@ -0,0 +1,191 @@
+import argparse
+import sys
+import time
+import numpy as np
+import pandas as pd
+import GameIntervalCreation
+import FeatureStore
+import ModelBundle
+from makeCombinedDataset import suffix
+
+#the features created for each game window, in the order collectDataForTeam returns them
+statNames = GameIntervalCreation.featureNames
+
+def seasonOf(date):
+    """Get the season a date belongs to, seasons are named after the year they start in.
+
+    Parameters:
+        date(Timestamp) - the date of the game.
+
+    Returns:
+        season(Int) - the season.
+    """
+    return date.year if date.month >= 9 else date.year - 1
+
+def routePhases(history,schedule,early=FeatureStore.phaseGames['Early'],mid=FeatureStore.phaseGames['Mid']):
+    """Choose the model for each scheduled game with the same rules that label the games in the feature store.
+
+    A game is early if it is among the first games of either team. Games that are early for either
+    team are then set aside and a game is mid if it is among the next games of either team, so a
+    team's middle games are counted from its games that were not early, see FeatureStore.phaseLabels.
+    Scheduled games are placed after the history in date order, and games already in the history
+    keep the label they have there.
+
+    Parameters:
+        history(DataFrame) - the cleaned game data, see GameIntervalCreation.loadData.
+        schedule(DataFrame) - the games to score, with Away_Team, Home_Team and Date columns.
+        early(Int) - the number of early games for each team.
+        mid(Int) - the number of middle games for each team.
+
+    Returns:
+        phases(List) - the model to use for each game (Early, Mid, Late).
+    """
+    keys = ['Date','Away_Team','Home_Team']
+    played = history[keys].reset_index(drop=True)
+    played['row'] = np.arange(len(played))
+
+    #find the scheduled games that have already been played
+    found = schedule[keys].merge(played.drop_duplicates(keys),on=keys,how='left')['row'].to_numpy()
+    upcoming = schedule[np.isnan(found)]
+    games = pd.concat([history[keys + ['season']],upcoming[keys].assign(season=[seasonOf(d) for d in upcoming['Date']])],ignore_index=True)
+
+    #number every team's games in date order, scheduled games after the played games of the same day
+    order = np.argsort(games['Date'].to_numpy(),kind='stable')
+    position = np.empty(len(order),dtype=np.int64)
+    position[order] = np.arange(len(order))
+    index = FeatureStore.teamGameIndex(position,games['season'].to_numpy(),games['Away_Team'].to_numpy(),games['Home_Team'].to_numpy())
+    codes = FeatureStore.phaseCodes(index,len(games),early,mid)
+
+    #upcoming games follow the history in the joined games
+    rows = found.copy()
+    rows[np.isnan(found)] = len(history) + np.arange(len(upcoming))
+
+    return [FeatureStore.GameDataset.phases[c] for c in codes[rows.astype(np.int64)]]
+
+def buildMatchupFeatures(history,schedule,windows=[5,10,20,40,82],crosses=(False,True),manifest=None):
+    """Build the features of each scheduled game from the latest history of both teams.
+
+    Parameters:
+        history(DataFrame) - the cleaned game data, see GameIntervalCreation.loadData.
+        schedule(DataFrame) - the games to score, with Away_Team, Home_Team and Date columns.
+        windows(List) - the game windows to build.
+        crosses(Tuple) - the cross modes to build.
+        manifest(List) - the (stat, window, cross) triples to build, see ModelBundle.requiredFeatures, None builds
+            every stat of the given windows and cross modes.
+
+    Returns:
+        features(DataFrame) - one row per game with a column for every feature built.
+        phases(List) - the model each game is routed to.
+    """
+    #the stats built for each window and cross mode
+    if manifest is None:
+        stats = {(window,cross): statNames for cross in crosses for window in windows}
+    else:
+        stats = GameIntervalCreation.requiredStats(manifest)
+
+    #route every game to the model of its phase
+    phases = routePhases(history,schedule)
+    rows = []
+
+    #select the games of every scheduled team once, no window needs more than the largest
+    teams = set(schedule['Away_Team']) | set(schedule['Home_Team'])
+    teamHistory = {team: history[(history['Away_Team'] == team) | (history['Home_Team'] == team)] for team in teams}
+    longest = max(window for window, cross in stats)
+
+    for game in schedule.itertuples():
+        season = seasonOf(game.Date)
+
+        #the latest games of both teams, across seasons and from this season only
+        recent = {}
+        for team in (game.Away_Team,game.Home_Team):
+            games = teamHistory[team]
+            games = games[games['Date'] < game.Date].tail(longest)
+            recent[(team,True)] = games
+            recent[(team,False)] = games[games['season'] == season]
+
+        #represent features as home_value - away_value for every window and cross mode
+        row = {}
+        for (window,cross), names in stats.items():
+            awayTeamData = GameIntervalCreation.collectDataForTeam(game.Away_Team,recent[(game.Away_Team,cross)],window,names)
+            homeTeamData = GameIntervalCreation.collectDataForTeam(game.Home_Team,recent[(game.Home_Team,cross)],window,names)
+            end = suffix(window,cross)
+            for name, home, away in zip(names,homeTeamData,awayTeamData):
+                row[name + end] = home - away
+        rows.append(row)
+
+    features = pd.DataFrame(rows,index=schedule.index)
+    features = features.replace([np.inf, -np.inf], np.nan).fillna(0)
+
+    return features, phases
+
+def scoreSchedule(schedule,bundles,history):
+    """Score every scheduled game with the model of its phase.
+
+    Only the features used by the bundles are built.
+
+    Parameters:
+        schedule(DataFrame) - the games to score, with Away_Team, Home_Team and Date columns.
+        bundles(Dict) - the loaded bundle of each phase.
+        history(DataFrame) - the cleaned game data.
+
+    Returns:
+        scored(DataFrame) - the schedule with the phase and home win probability of each game.
+        timings(Dict) - the seconds spent building features and scoring.
+    """
+    start = time.perf_counter()
+    features, phases = buildMatchupFeatures(history,schedule,manifest=ModelBundle.requiredFeatures(bundles))
+    built = time.perf_counter()
+
+    scored = schedule.copy()
+    scored['Phase'] = phases
+    scored['Home_Win_Probability'] = np.nan
+
+    #score all the games of a phase in one batch
+    for phase, bundle in bundles.items():
+        rows = scored['Phase'] == phase
+        if rows.any():
+            X = features.loc[rows,list(bundle['features'])].to_numpy(dtype='float32')
+            scored.loc[rows,'Home_Win_Probability'] = ModelBundle.predictProba(bundle,X)
+
+    timings = {'features': built - start, 'scoring': time.perf_counter() - built}
+
+    return scored, timings
+
+def main(argv=None):
+    """Score a schedule of upcoming games from the command line."""
+    parser = argparse.ArgumentParser(description="Score upcoming games with the exported Early, Mid and Late models.")
+    parser.add_argument("schedule",help="csv of games with Away_Team, Home_Team and Date (YYYY-MM-DD) columns")
+    parser.add_argument("--output",help="where the scored games are written, printed when not given")
+    parser.add_argument("--version",help="the bundle version to use, defaults to the latest")
+    parser.add_argument("--history",default="Database/NHLData.csv",help="the game database used to build features")
+    parser.add_argument("--engine",choices=['compiled','sklearn'],default='compiled',help="evaluate the flattened trees or the sklearn classifiers")
+    parser.add_argument("--max-ms",type=float,help="fail if scoring takes longer than this many milliseconds")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    bundles = ModelBundle.loadBundles(args.version,args.engine == 'compiled')
+    history = GameIntervalCreation.loadData(args.history)
+    schedule = pd.read_csv(args.schedule)
+    schedule['Date'] = pd.to_datetime(schedule['Date'],format='%Y-%m-%d')
+    loaded = time.perf_counter()
+
+    scored, timings = scoreSchedule(schedule,bundles,history)
+    total = (time.perf_counter() - start) * 1000
+
+    if args.output:
+        scored.to_csv(args.output,index=False)
+    else:
+        print(scored.to_string(index=False))
+
+    #report latency on stderr so it does not mix with the scores
+    print("Scored " + str(len(scored)) + " games in " + str(round(total,1)) + " ms (load " + str(round((loaded - start) * 1000,1)) +
+          " ms, features " + str(round(timings['features'] * 1000,1)) + " ms, scoring " + str(round(timings['scoring'] * 1000,1)) + " ms)",file=sys.stderr)
+
+    if args.max_ms is not None and total > args.max_ms:
+        print("Latency target of " + str(args.max_ms) + " ms missed",file=sys.stderr)
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import numpy as np
+
+def flattenForest(classifier):
+    """Flatten the trees of a fitted binary tree ensemble into contiguous node arrays.
+
+    The nodes of every tree are stored one after another. Leaves point to themselves and have an
+    infinite threshold, so every tree can be walked the same number of steps.
+
+    Parameters:
+        classifier(ExtraTreesClassifier) - a fitted ensemble with two classes.
+
+    Returns:
+        flat(Dict) - the feature, threshold, left child, right child and home win probability of every
+            node, the root of every tree and the depth of the deepest tree.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+
+    for estimator in classifier.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        isLeaf = tree.children_left == -1
+
+        #leaves loop back to themselves
+        features.append(np.where(isLeaf,0,tree.feature))
+        thresholds.append(np.where(isLeaf,np.inf,tree.threshold))
+        lefts.append(np.where(isLeaf,nodes,tree.children_left) + offset)
+        rights.append(np.where(isLeaf,nodes,tree.children_right) + offset)
+
+        #each tree predicts the share of home wins in the leaf
+        counts = tree.value[:,0,:]
+        values.append(counts[:,1] / counts.sum(axis=1))
+
+        roots.append(offset)
+        offset += tree.node_count
+        depth = max(depth,tree.max_depth)
+
+    return {'feature': np.concatenate(features).astype(np.int32),
+            'threshold': np.concatenate(thresholds).astype(np.float64),
+            'left': np.concatenate(lefts).astype(np.int32),
+            'right': np.concatenate(rights).astype(np.int32),
+            'value': np.concatenate(values).astype(np.float64),
+            'roots': np.array(roots,dtype=np.int32),
+            'depth': depth}
+
+def predictProba(flat,X):
+    """Predict class probabilities for a batch of games across every tree at once.
+
+    Matches the classifier's predict_proba, comparing float32 features against the thresholds.
+
+    Parameters:
+        flat(Dict) - the node arrays created by flattenForest.
+        X(Array) - the games, one column per feature the ensemble was trained on.
+
+    Returns:
+        proba(Array) - the probability of an away and a home win for each game.
+    """
+    X = np.asarray(X,dtype=np.float32)
+    rows = np.arange(X.shape[0])[:,None]
+
+    #every game starts at the root of every tree
+    node = np.repeat(flat['roots'][None,:],X.shape[0],axis=0)
+
+    #walk down one level of every tree per step
+    for _ in range(flat['depth']):
+        goLeft = X[rows,flat['feature'][node]] <= flat['threshold'][node]
+        node = np.where(goLeft,flat['left'][node],flat['right'][node])
+
+    home = flat['value'][node].mean(axis=1)
+
+    return np.column_stack([1 - home,home])
@@ -1,47 +1,146 @@
+import os
 import pandas as pd
+import GameIntervalCreation
+import FeatureStore
 
-def combine(lst,cross):
-    """Add a set of dataframes together in a list.
+#columns shared by every game window, these are not renamed
+keep_same = FeatureStore.keep_same
+
+def suffix(gameWindow,cross):
+    """Get the suffix added to the features of a game window.
+
+    Cross features carry an extra '.1' which is the name pandas gives the second of the
+    duplicated column names when the combined csv is read back in.
 
     Parameters:
-        lst(List) - a list of integers that represent number of games used to assess quality in the retrieved files.
-        cross(Bool) - should cross or nocross files be retrieved.
+        gameWindow(Int) - the number of games used to assess quality.
+        cross(Bool) - whether games from previous seasons were used.
 
     Returns:
-        dfs(List) - a list of dataframes to be joined together.
+        end(String) - the suffix for the features.
     """
-    #where dataframes will be stored
-    dfs = []
-
-    #determine how the file name ends
     if cross:
-        end = 'Cross'
+        return ' ' + str(gameWindow) + '.1'
     else:
-        end = 'NoCross'
-
-    #iterate through files and add the to the list of dataframes
-    for i in lst:
-        df = pd.read_csv("DataFrames/" + str(i) + end + ".csv")
-        keep_same = {'Game_Id', 'RegOrOT','season','Away_Team','Home_Team','Outcome','isPlayoff'}
-        df.columns = ['{}{}'.format(c, '' if c in keep_same else ' ' + str(i)) for c in df.columns]
-        dfs.append(df)
-    
-    return dfs
-
-#where all frames will be stored, and the game intervals used in the datasets
-dfs = []
-lst = [5,10,20,40,82]
-
-#combine nocross and cross dataframes
-noCross = combine(lst,False)
-cross =  combine(lst,True)
-
-#put all dataframes in one list
-dfs.extend(noCross)
-dfs.extend(cross)
-
-#set index and join all frames into one based off index
-dfs = [df.set_index(['Game_Id','RegOrOT','season','Away_Team','Home_Team','Outcome','isPlayoff']) for df in dfs]
-combined = pd.concat(dfs, axis=1)
-print(combined.columns)
-combined.to_csv("DataFrames/CombinedFrame.csv",index=True)
+        return ' ' + str(gameWindow)
+
+def renameFeatures(df,gameWindow,cross):
+    """Add the game window suffix to every feature in a dataframe.
+
+    Parameters:
+        df(DataFrame) - a dataframe created by GameIntervalCreation.
+        gameWindow(Int) - the number of games used to assess quality.
+        cross(Bool) - whether games from previous seasons were used.
+
+    Returns:
+        df(DataFrame) - the dataframe with renamed features.
+    """
+    end = suffix(gameWindow,cross)
+    df.columns = ['{}{}'.format(c, '' if c in keep_same else end) for c in df.columns]
+
+    return df
+
+def readWindows(lst,crosses=(False,True)):
+    """Read the game window csvs.
+
+    Parameters:
+        lst(List) - a list of integers that represent number of games used to assess quality in the retrieved files.
+        crosses(Tuple) - should cross or nocross files be retrieved, every nocross file comes first by default.
+
+    Returns:
+        frames(Dict) - the dataframes keyed by (game window, cross).
+    """
+    frames = {}
+
+    for cross in crosses:
+        #determine how the file name ends
+        if cross:
+            end = 'Cross'
+        else:
+            end = 'NoCross'
+
+        for i in lst:
+            frames[(i,cross)] = pd.read_csv("DataFrames/" + str(i) + end + ".csv")
+
+    return frames
+
+def combineFrames(frames):
+    """Join the in-memory game window frames into a single frame aligned on Game_Id.
+
+    Parameters:
+        frames(Dict) - dataframes created by GameIntervalCreation keyed by (game window, cross).
+
+    Returns:
+        combined(DataFrame) - the combined frame with the shared columns first.
+    """
+    #the shared columns are taken from the first frame
+    first = next(iter(frames.values()))
+    base = first[keep_same].set_index('Game_Id',drop=False)
+
+    #only the features of each frame are joined
+    features = []
+    for (i,cross), df in frames.items():
+        df = renameFeatures(df.drop(columns=[c for c in keep_same if c != 'Game_Id']),i,cross)
+        features.append(df.set_index('Game_Id'))
+
+    combined = pd.concat([base] + features, axis=1)
+
+    return combined.reset_index(drop=True)
+
+def buildCombined(lst=[5,10,20,40,82],workers=None,writeWindows=False,path=FeatureStore.storePath,csvPath=None,manifest=None):
+    """Create the game window frames and combine them without reading them back from csv.
+
+    With a manifest only the features the exported models use are created, so the combined frame
+    can refresh those models' features but not train new ones. It must then be written somewhere
+    other than the training store and csv, or not written at all.
+
+    Parameters:
+        lst(List) - a list of integers that represent number of games used to assess quality.
+        workers(Int) - the number of processes used to create the game window frames.
+        writeWindows(Bool) - should each game window frame also be written to its csv?
+        path(String) - where the combined feature store is written, None to skip writing. Required to be
+            another location, or None, when a manifest is given.
+        csvPath(String) - where the combined csv is written, None to skip writing.
+        manifest(List) - the (stat, window, cross) triples to create, see ModelBundle.readFeatureManifest, None creates every feature.
+
+    Returns:
+        combined(DataFrame) - the combined frame.
+    """
+    #a frame with only the manifest's features must never replace the training data
+    if manifest is not None:
+        for target, training in [(path,FeatureStore.storePath),(csvPath,FeatureStore.csvPath)]:
+            if target is not None and os.path.abspath(target) == os.path.abspath(training):
+                raise ValueError("A frame built from a manifest only has the features of the exported models and would replace the training data at " +
+                                 training + ", pass another path or None")
+
+    #create every nocross window followed by every cross window
+    frames = GameIntervalCreation.runParallel(lst,(False,True),workers,writeWindows,manifest)
+    combined = combineFrames(frames)
+
+    if path is not None:
+        FeatureStore.writeStore(combined,path)
+
+    if csvPath is not None:
+        combined.to_csv(csvPath,index=False)
+
+    return combined
+
+def main(lst=[5,10,20,40,82],path=FeatureStore.storePath):
+    """Join the game window csvs and write the combined frame to the feature store.
+
+    Parameters:
+        lst(List) - a list of integers that represent number of games used to assess quality.
+        path(String) - where the combined feature store is written.
+
+    Returns:
+        combined(DataFrame) - the combined frame.
+    """
+    #join the frames in memory, the store is read by ModelCreation so no combined csv is written
+    combined = combineFrames(readWindows(lst))
+    print(combined.columns)
+    FeatureStore.writeStore(combined,path)
+
+    return combined
+
+if __name__ == '__main__':
+    main()